@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 10:12:31
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 10:12:31
+
+"""
+Benchmarks of pycoronadata hot paths, run offline on synthetic data
+Usage : python -m pycoronadata.benchmark [--suite micro|pipeline|all] [--locations 300] [--days 100] [--repeat 3] [--output fname]
+
+micro : previous implementations against current ones
+pipeline : GeoCoronaData stages on synthetic JHU csv files, with time and peak memory (tracemalloc)
+"""
+
+import os
+import sys
+import time
+import json
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pycoronadata.core import CoronaData, GeoCoronaData, PersistantGeoCoronaData
+
+# ----------------------------------------------------------------------------------------------------------------
+# Synthetic data
+
+def synthetic_long_frame(nlocations=300, ndays=100, prc_known=.5, seed=0) :
+    """
+    Melted JHU like dataframe with a mix of known and unknown country names
+    
+    Keyword Arguments:
+        nlocations {int} -- [Number of locations] (default: {300})
+        ndays {int} -- [Number of days] (default: {100})
+        prc_known {float} -- [Fraction of locations with a country name found in geodata] (default: {.5})
+        seed {int} -- [Random seed] (default: {0})
+    
+    Returns:
+        [tuple] -- [(DataFrame, country names set, {(longitude, latitude) : country} dictionary)]
+    """
+
+    rng = np.random.default_rng(seed)
+
+    cnames = [f"Country{idx}" for idx in range(max(nlocations // 2, 1))]
+    countries = rng.choice(cnames, nlocations)
+    known = rng.random(nlocations) < prc_known
+    names = np.where(known, countries, [f"Alias{idx}" for idx in range(nlocations)])
+
+    lons = rng.uniform(-180, 180, nlocations).round(4)
+    lats = rng.uniform(-60, 80, nlocations).round(4)
+
+    # Known locations without coordinates, like JHU "Unknown" or "Repatriated Travellers" rows
+    nocoor = np.flatnonzero(known)[:2]
+    lons[nocoor], lats[nocoor] = np.nan, np.nan
+    unique_coor = {(lon, lat) : country for lon, lat, country in zip(lons, lats, countries)}
+
+    dates = pd.date_range("2020-01-22", periods=ndays).date
+    cdf = pd.DataFrame({
+        "Province/State" : np.nan,
+        "Country/Region" : np.repeat(names, ndays),
+        "Lat" : np.repeat(lats, ndays),
+        "Long" : np.repeat(lons, ndays),
+        "Date" : np.tile(dates, nlocations),
+        })
+
+    for name in ("Confirmed", "Deaths", "Recovered") :
+        cdf[name] = rng.integers(0, 1000, len(cdf))
+
+    return cdf, set(cnames), unique_coor
+
+def synthetic_wide_frames(nlocations=300, ndays=100, prc_missing=.1, seed=0) :
+    """
+    Confirmed, deaths and recovered JHU like wide dataframes
+    Like the JHU files, the recovered serie misses some locations and has a few extra ones
+    
+    Keyword Arguments:
+        nlocations {int} -- [Number of locations] (default: {300})
+        ndays {int} -- [Number of days] (default: {100})
+        prc_missing {float} -- [Fraction of locations missing from the recovered serie] (default: {.1})
+        seed {int} -- [Random seed] (default: {0})
+    
+    Returns:
+        [tuple] -- [(DataFrame list, serie names)]
+    """
+
+    rng = np.random.default_rng(seed)
+
+    locations = pd.DataFrame({
+        "Province/State" : [f"Province{idx}" if idx % 3 else np.nan for idx in range(nlocations)],
+        "Country/Region" : [f"Country{idx // 3}" for idx in range(nlocations)],
+        "Lat" : rng.uniform(-60, 80, nlocations).round(4),
+        "Long" : rng.uniform(-180, 180, nlocations).round(4),
+        })
+
+    dates = [f"{date.month}/{date.day}/{date.year % 100}" for date in pd.date_range("2020-01-22", periods=ndays)]
+
+    frames = []
+    for _ in range(3) :
+        values = pd.DataFrame(rng.integers(0, 100, (nlocations, ndays)).cumsum(axis=1), columns=dates)
+        frames.append(pd.concat((locations, values), axis=1))
+
+    recovered = frames[-1][rng.random(nlocations) >= prc_missing]
+    extra = recovered.head(max(int(nlocations * prc_missing / 10), 1)).copy()
+    extra["Province/State"] = "Recovered"
+    frames[-1] = pd.concat((recovered, extra), ignore_index=True)
+
+    return frames, ["Confirmed", "Deaths", "Recovered"]
+
+def load_geodata(detail=110) :
+    # Internal geodata countries and polygones
+    import geopandas as gpd
+    fname = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geodata", f"ne_{detail}m", f"ne_{detail}m_admin_0_countries.shp")
+    gdf = gpd.read_file(fname)[["ADMIN", "geometry"]]
+    return gdf.rename(columns={"ADMIN" : "Country"})
+
+def synthetic_jhu_frames(gdf, nlocations=300, ndays=100, prc_alias=.3, prc_missing=.1, seed=0) :
+    """
+    Confirmed, deaths and recovered JHU like wide dataframes, located within geodata countries
+    Each location lies inside a country, aliases (names unknown from geodata) are resolved with coordinates
+    
+    Arguments:
+        gdf {[GeoDataFrame]} -- [Geodata with Country and geometry columns]
+    
+    Keyword Arguments:
+        nlocations {int} -- [Number of locations] (default: {300})
+        ndays {int} -- [Number of days] (default: {100})
+        prc_alias {float} -- [Fraction of locations with a country name not found in geodata] (default: {.3})
+        prc_missing {float} -- [Fraction of locations missing from the recovered serie] (default: {.1})
+        seed {int} -- [Random seed] (default: {0})
+    
+    Returns:
+        [tuple] -- [(DataFrame list, serie names)]
+    """
+
+    rng = np.random.default_rng(seed)
+    frames, names = synthetic_wide_frames(nlocations, ndays, prc_missing, seed)
+
+    # Same location columns in each serie, recovered extra rows included
+    # Each location is slightly moved from its country point, so that location keys stay unique like in JHU files
+    points = gdf["geometry"].representative_point()
+    locations = {coor : idx for idx, coor in enumerate(zip(frames[0]["Lat"], frames[0]["Long"]))}
+    countries = {}
+    for name in frames[0]["Country/Region"].unique() :
+        idx = rng.integers(len(gdf))
+        alias = rng.random() < prc_alias
+        countries[name] = (f"Alias of {gdf['Country'].iloc[idx]}" if alias else gdf["Country"].iloc[idx], idx)
+
+    for df in frames :
+        idx = df["Country/Region"].map(lambda name : countries[name][1])
+        offset = np.array([locations[coor] for coor in zip(df["Lat"], df["Long"])]) * 1e-5
+        df["Lat"] = (points.y.to_numpy()[idx] + offset).round(6)
+        df["Long"] = points.x.to_numpy()[idx]
+        df["Country/Region"] = df["Country/Region"].map(lambda name : countries[name][0])
+
+    return frames, names
+
+def write_fixtures(directory, gdf, nlocations=300, ndays=100, seed=0) :
+    """
+    Write synthetic JHU csv files, named like the JHU time series
+    
+    Arguments:
+        directory {[str]} -- [Output directory]
+        gdf {[GeoDataFrame]} -- [Geodata with Country and geometry columns]
+    
+    Keyword Arguments:
+        nlocations {int} -- [Number of locations] (default: {300})
+        ndays {int} -- [Number of days] (default: {100})
+        seed {int} -- [Random seed] (default: {0})
+    
+    Returns:
+        [str list] -- [Confirmed, deaths and recovered file paths, usable as sources]
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    frames, names = synthetic_jhu_frames(gdf, nlocations, ndays, seed=seed)
+
+    sources = []
+    for df, name in zip(frames, names) :
+        fname = os.path.join(directory, f"time_series_covid19_{name.lower()}_global.csv")
+        df.to_csv(fname, index=False)
+        sources.append(fname)
+
+    return sources
+
+# ----------------------------------------------------------------------------------------------------------------
+# Previous implementations, kept as reference
+
+def legacy_map_countries(cdf, cnames, unique_coor) :
+    cdf = cdf.copy()
+    cdf["GCountry"] = cdf["Country/Region"].apply(lambda x : x if x in cnames else np.nan)
+    fun_mapping = lambda row : unique_coor[(row["Long"], row["Lat"])]
+    cdf.loc[cdf["GCountry"].isna(), "GCountry"] = cdf[cdf["GCountry"].isna()].apply(fun_mapping, axis=1)
+    return cdf["GCountry"]
+
+def legacy_as_datetime(dates) :
+    transform_date = lambda date : datetime.combine(date, datetime.min.time())
+    return dates.apply(transform_date)
+
+def legacy_join_time_series(frames, names) :
+    data = [CoronaData.melt_time_serie(df, name) for df, name in zip(frames, names)]
+    df = data.pop(0)
+
+    while data :
+        df = df.merge(data.pop(0), on=list(df.columns[:5]), how="outer")
+
+    for name in names :
+        df[name] = df[name].fillna(0).astype(int)
+
+    return df
+
+# ----------------------------------------------------------------------------------------------------------------
+# Benchmarks
+
+def timer(fun, * args, repeat=3, ** kwargs) :
+    # Best time over repeat runs, with the last result
+    best = None
+    for _ in range(repeat) :
+        start = time.perf_counter()
+        result = fun(* args, ** kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def same_rows(left, right) :
+    # Row order is not part of the result
+    sort = lambda df : df.sort_values(list(df.columns)).reset_index(drop=True)
+    return sort(left).equals(sort(right))
+
+def compare(name, legacy, vectorized, nrows, repeat=3, same=None) :
+    ltime, lresult = timer(* legacy, repeat=repeat)
+    vtime, vresult = timer(* vectorized, repeat=repeat)
+
+    return {
+        "name" : name,
+        "rows" : nrows,
+        "legacy_s" : ltime,
+        "vectorized_s" : vtime,
+        "legacy_us_per_row" : ltime * 1e6 / nrows,
+        "vectorized_us_per_row" : vtime * 1e6 / nrows,
+        "speedup" : ltime / vtime if vtime else np.inf,
+        "identical" : same(lresult, vresult) if same else lresult.equals(vresult)
+        }
+
+def bench_map_countries(nlocations=300, ndays=100, repeat=3) :
+    cdf, cnames, unique_coor = synthetic_long_frame(nlocations, ndays)
+    return compare("map_countries", 
+        (legacy_map_countries, cdf, cnames, unique_coor),
+        (GeoCoronaData.map_countries, cdf, cnames, unique_coor),
+        len(cdf), repeat)
+
+def bench_as_datetime(nlocations=300, ndays=100, repeat=3) :
+    cdf, cnames, unique_coor = synthetic_long_frame(nlocations, ndays)
+    return compare("as_datetime",
+        (legacy_as_datetime, cdf["Date"]),
+        (GeoCoronaData.as_datetime, cdf["Date"]),
+        len(cdf), repeat)
+
+def bench_join_time_series(nlocations=300, ndays=100, repeat=3) :
+    frames, names = synthetic_wide_frames(nlocations, ndays)
+    return compare("join_time_series",
+        (legacy_join_time_series, frames, names),
+        (CoronaData.join_time_series, frames, names),
+        sum(df.shape[0] * (df.shape[1] - 4) for df in frames), repeat, same_rows)
+
+BENCHMARKS = [bench_map_countries, bench_as_datetime, bench_join_time_series]
+
+def run(nlocations=300, ndays=100, repeat=3) :
+    return [bench(nlocations, ndays, repeat) for bench in BENCHMARKS]
+
+# ----------------------------------------------------------------------------------------------------------------
+# Pipeline
+
+def measure(name, fun, setup=None, repeat=3, rows=None, calls=1) :
+    """
+    Best time over repeat runs, then peak memory of one more run traced with tracemalloc
+    Tracing slows allocations down, time and memory are never measured on the same run
+    
+    Arguments:
+        name {[str]} -- [Benchmark name]
+        fun {[function]} -- [Function to measure]
+    
+    Keyword Arguments:
+        setup {[function]} -- [Called before each run (not measured), returns fun arguments] (default: {None})
+        repeat {int} -- [Number of timed runs] (default: {3})
+        rows {[function]} -- [Number of rows from the result] (default: {len})
+        calls {int} -- [Number of calls made by fun, to report time per call] (default: {1})
+    
+    Returns:
+        [dict] -- [name, seconds, seconds_per_call, peak_bytes and rows]
+    """
+
+    setup = setup or tuple
+    rows = rows or (lambda result : None if result is None else len(result))
+
+    best = None
+    for _ in range(repeat) :
+        args = setup()
+        start = time.perf_counter()
+        result = fun(* args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    args = setup()
+    tracemalloc.start()
+    try :
+        result = fun(* args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally :
+        tracemalloc.stop()
+
+    return {
+        "name" : name,
+        "seconds" : best,
+        "seconds_per_call" : best / calls,
+        "peak_bytes" : peak,
+        "rows" : rows(result)
+        }
+
+def sample(values, count) :
+    # count values evenly spaced
+    values = list(values)
+    if len(values) <= count : return values
+    return [values[int(idx)] for idx in np.linspace(0, len(values) - 1, count)]
+
+def bench_pipeline(sources, directory, repeat=3, detail=110, queries=20, formats=("csv", "parquet", "feather"), logger=None) :
+    results = []
+    frames = [pd.read_csv(fname) for fname in sources]
+    total = lambda dfs : sum(len(df) for df in dfs)
+
+    results.append(measure("read_time_series", CoronaData.read_time_series, lambda : (logger, sources), repeat, total))
+    results.append(measure("corona_data_from_time_series", CoronaData.corona_data_from_time_series,
+        lambda : (logger, True, True, sources, None, frames), repeat))
+
+    # Whole instance creation, fetch and geo resolution included
+    build = lambda : GeoCoronaData(sources=sources, detail=detail, logger=logger)
+    results.append(measure("GeoCoronaData", build, repeat=repeat, rows=lambda instance : len(instance.cdf)))
+    gcd = build()
+
+    def clear_coordinates() :
+        # Coordinates are resolved again within polygones
+        gcd.coorcache.data.clear()
+        return ()
+
+    results.append(measure("generate_cdf", lambda : gcd.generate_cdf(frames=frames), clear_coordinates, repeat))
+    results.append(measure("generate_cdf_cached_coordinates", lambda : gcd.generate_cdf(frames=frames), repeat=repeat))
+
+    raw = gcd.generate_cdf(frames=frames)
+    results.append(measure("setup_cdf", lambda cdf : gcd.setup_cdf(cdf, 14), lambda : (raw.copy(),), repeat))
+
+    days = sample(gcd.days(), queries)
+    countries = sample(gcd.unique("Country"), queries)
+    continents = gcd.unique("Continent")
+
+    query = lambda fun, values, ** kwargs : lambda : [fun(value, ** kwargs) for value in values]
+
+    results.append(measure("data_from_day", query(gcd.data_from_day, days), 
+        repeat=repeat, rows=total, calls=len(days)))
+    results.append(measure("data_from_day_fill", query(gcd.data_from_day, days, fill=True), 
+        repeat=repeat, rows=total, calls=len(days)))
+    results.append(measure("data_from_day_fill_continent", query(gcd.data_from_day, days, fill=True, geocolumn="Continent"), 
+        repeat=repeat, rows=total, calls=len(days)))
+    results.append(measure("data_from_geocol_fill", query(gcd.data_from_geocol, countries, geocolumn="Country", fill=True), 
+        repeat=repeat, rows=total, calls=len(countries)))
+    results.append(measure("data_from_geocol_fill_continent", query(gcd.data_from_geocol, continents, geocolumn="Continent", fill=True), 
+        repeat=repeat, rows=total, calls=len(continents)))
+
+    def clear_mappers() :
+        # Mappers are cached, cleared to measure their computation (polygones are already loaded)
+        gcd.geocache.clear()
+        return ()
+
+    gcd.gdf
+    for column in ("Country", "Continent") :
+        results.append(measure(f"make_geo_mapper_{column.lower()}", lambda : gcd.make_geo_mapper(column), clear_mappers, repeat))
+        results.append(measure(f"make_geo_mapper_{column.lower()}_cached", lambda : gcd.make_geo_mapper(column), repeat=repeat))
+
+    for ext in formats :
+        fname = os.path.join(directory, f"cdf.{ext}")
+        load = lambda : PersistantGeoCoronaData(fname=fname, sources=sources, detail=detail, logger=logger)
+
+        # Built from fixtures since the file does not exist yet, then saved and loaded from file
+        pgcd = load()
+        results.append(measure(f"save_{ext}", pgcd.save, repeat=repeat, rows=lambda _ : len(pgcd.cdf)))
+        results.append(measure(f"load_{ext}", load, repeat=repeat, rows=lambda instance : len(instance.cdf)))
+
+    return results
+
+def run_pipeline(nlocations=300, ndays=100, repeat=3, detail=110, queries=20, formats=("csv", "parquet", "feather"), directory=None) :
+    """
+    Benchmark GeoCoronaData stages on synthetic JHU csv files, without network access
+    
+    Keyword Arguments:
+        nlocations {int} -- [Number of locations] (default: {300})
+        ndays {int} -- [Number of days] (default: {100})
+        repeat {int} -- [Number of timed runs per benchmark (best is kept)] (default: {3})
+        detail {int} -- [Internal geodata detail (10, 50 or 110)] (default: {110})
+        queries {int} -- [Number of days or locations queried by query benchmarks] (default: {20})
+        formats {[str list]} -- [Persistant file formats to save and load] (default: {("csv", "parquet", "feather")})
+        directory {[str]} -- [Directory for fixtures and saved files, temporary if None] (default: {None})
+    
+    Returns:
+        [list] -- [One dictionary for each benchmark]
+    """
+
+    logger = logging.getLogger("pycoronadata.benchmark")
+    logger.setLevel(logging.ERROR)
+
+    tmpdir = directory or tempfile.mkdtemp(prefix="pycoronadata-bench-")
+
+    try :
+        gdf = load_geodata(detail)
+        sources = write_fixtures(os.path.join(tmpdir, "fixtures"), gdf, nlocations, ndays)
+        return bench_pipeline(sources, tmpdir, repeat, detail, queries, formats, logger)
+
+    finally :
+        if directory is None : shutil.rmtree(tmpdir, ignore_errors=True)
+
+def metadata(args) :
+    return {
+        "date" : datetime.now().isoformat(timespec="seconds"),
+        "python" : platform.python_version(),
+        "platform" : platform.platform(),
+        "numpy" : np.__version__,
+        "pandas" : pd.__version__,
+        "arguments" : vars(args)
+        }
+
+if __name__ == "__main__" :
+    parser = argparse.ArgumentParser(description="pycoronadata benchmarks")
+    parser.add_argument("--suite", choices=["micro", "pipeline", "all"], default="all", help="Benchmarks to run")
+    parser.add_argument("--locations", type=int, default=300, help="Number of locations")
+    parser.add_argument("--days", type=int, default=100, help="Number of days")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per benchmark (best is kept)")
+    parser.add_argument("--detail", type=int, default=110, help="Internal geodata detail used by the pipeline suite")
+    parser.add_argument("--queries", type=int, default=20, help="Number of queried days or locations in the pipeline suite")
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet", "feather"], help="Persistant file formats")
+    parser.add_argument("--output", help="Write results in this json file instead of stdout")
+    args = parser.parse_args()
+
+    results = {"metadata" : metadata(args)}
+    if args.suite in ("micro", "all") :
+        results["micro"] = run(args.locations, args.days, args.repeat)
+    if args.suite in ("pipeline", "all") :
+        results["pipeline"] = run_pipeline(args.locations, args.days, args.repeat, args.detail, args.queries, args.formats)
+
+    if args.output :
+        with open(args.output, "w") as f : json.dump(results, f, indent=4)
+    else :
+        json.dump(results, sys.stdout, indent=4)
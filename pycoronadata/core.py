@@ -9,22 +9,32 @@ rpath = os.path.realpath(__file__)
 bname = os.path.basename
 dname = os.path.dirname
 
-from datetime import datetime
-from functools import lru_cache
-
+import io
+import asyncio
+import hashlib
 import logging
+import functools
 import zipfile
 import json
+import threading
 
 import numpy as np
 import pandas as pd
 
-import geopandas as gpd
-
-from shapely.geometry import Point
-from shapely.ops import cascaded_union
+# geopandas and shapely are imported when geometry is needed
 
 from pycoronadata import utils 
+from pycoronadata import fetch
+from pycoronadata import geocache
+from pycoronadata import geoexport
+from pycoronadata import snapshot
+from pycoronadata import refresh
+from pycoronadata import instrument
+from pycoronadata import storage
+from pycoronadata.cube import CoronaCube
+from pycoronadata.rollup import Rollup
+from pycoronadata.lookup import ColumnIndex
+from pycoronadata.querycache import QueryCache
 
 TESTING = False
 
@@ -40,7 +50,7 @@ class CoronaData() :
 
     ALLOWED_GB = {"Province/State", "Country/Region", "Lat", "Long"}
 
-    def __init__(self, gb, rtime=None, logger=None, head=0) :
+    def __init__(self, gb, rtime=None, logger=None, head=0, sources=None, fetcher=None, compact=False, float32=False, chunk=None) :
         """        
         Object which fetch and contains coronadata from the Johns Hopkins Institut
         https://github.com/CSSEGISandData/COVID-19
@@ -52,18 +62,55 @@ class CoronaData() :
             rtime {int} -- [Recovery time] (default: {14})
             logger {[logging.Logger]} -- [Logger] (default: {None})
             head {int} -- [Number of row if a subset is needed (dataframe.head)] (default: {0})
+            sources {[str list]} -- [Confirmed, deaths and recovered time series (url, file:// url or path)] (default: {TIME_SERIES})
+            fetcher {[fetch.Fetcher]} -- [Fetcher used to download time series] (default: {None})
+            compact {bool} -- [Store cdf with compact dtypes (see compact_cdf)] (default: {False})
+            float32 {bool} -- [With compact, store rates and per 10K columns as float32] (default: {False})
+            chunk {int} -- [Number of date columns processed at once, all at once if None] (default: {None})
         """
 
         self.logger = logger or logging.getLogger(utils.LOG_NAME)
         self.logger.debug("Initiate CoronaData instance ...")
 
+        self._compact = compact
+        self._float32 = float32
+        self._chunk = chunk
+
+        # cdf and derived structures are replaced together, queries may run in other threads
+        self._lock = threading.RLock()
+
         self.check_inputs(gb)
         self._gb = gb
 
+        self._sources = list(sources or TIME_SERIES)
+        self._fetcher = fetcher or fetch.Fetcher(logger=self.logger)
+
         self.logger.debug("Load cdf file")
-        self._cdf = self.load_cdf(rtime, head)
+        self._generation = 0
+        self.set_cdf(self.load_cdf(rtime, head))
         self.logger.debug("Finish instance")
 
+    @classmethod
+    async def abuild(cls, * args, executor=None, ** kwargs) :
+        """
+        Create an instance without blocking the event loop
+        Fetch and data generation run in an executor, the instance is the one cls(* args, ** kwargs) returns
+        
+        Keyword Arguments:
+            executor {[concurrent.futures.Executor]} -- [Thread executor, loop default executor if None] (default: {None})
+        
+        Returns:
+            [CoronaData] -- [New instance]
+        """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(cls, * args, ** kwargs))
+
+    async def arun(self, fun, * args, executor=None, ** kwargs) :
+        # Instance method called in an executor, cdf is swapped under lock so queries can run meanwhile
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(fun, * args, ** kwargs))
+
     @property
     def gb(self):
         return self._gb
@@ -72,6 +119,66 @@ class CoronaData() :
     def cdf(self):
         return self._cdf
 
+    @property
+    def generation(self):
+        # Incremented each time cdf is replaced
+        return self._generation
+
+    @property
+    def compact(self):
+        return self._compact
+
+    def set_cdf(self, cdf) :
+        if self.compact : cdf = self.compact_cdf(cdf, self._float32)
+        with self._lock :
+            self._cdf = cdf
+            self._generation += 1
+            self.clear_derived()
+
+    def clear_derived(self) :
+        # Drop data structures computed from the previous cdf
+        self._indexes = {}
+
+    def column_index(self, column) :
+        # Built on first use for the current cdf
+        with self._lock :
+            if column not in self._indexes :
+                self._indexes[column] = ColumnIndex(self.cdf[column])
+            return self._indexes[column]
+
+    def normalize_day(self, day, report=False) :
+        # Compact cdf stores dates as datetime64
+        if report or not pd.api.types.is_datetime64_any_dtype(self.cdf["Date"]) : return day
+        return pd.Timestamp(day)
+
+    def select_rows(self, column, value) :
+        """
+        Rows where column equals value, same result than cdf[cdf[column] == value]
+        
+        Arguments:
+            column {[str]} -- [Column name]
+            value {[object]} -- [Value to select]
+        
+        Returns:
+            [pd.DataFrame] -- [Selected rows]
+        """
+
+        with self._lock :
+            cdf, index = self.cdf, self.column_index(column)
+        return cdf.iloc[index.positions(value)]
+
+    @property
+    def sources(self):
+        return self._sources
+
+    @property
+    def fetcher(self):
+        return self._fetcher
+
+    @property
+    def chunk(self):
+        return self._chunk
+
     def allowed_gb(self) :
         return CoronaData.ALLOWED_GB
 
@@ -82,8 +189,8 @@ class CoronaData() :
         if supplementals : 
             raise ValueError(f"Unknown gb : {supplementals} - Allowed : {CoronaData.ALLOWED_GB}")
 
-    def load_cdf(self, rtime, head=0) :
-        cdf = self.generate_cdf()
+    def load_cdf(self, rtime, head=0, frames=None) :
+        cdf = self.generate_cdf(frames=frames)
         cdf = self.setup_cdf(cdf, rtime)
         if head : cdf = cdf.head(head)
         return cdf
@@ -103,7 +210,7 @@ class CoronaData() :
         """
 
         self.logger.info(f"Change recovery time to : {rtime}. Can take time ...")
-        self._cdf = self.setup_cdf(self.cdf, rtime=rtime)
+        self.set_cdf(self.setup_cdf(self.cdf, rtime=rtime))
 
     def unique(self, column) :
         return sorted(self.cdf[column].unique())
@@ -120,49 +227,240 @@ class CoronaData() :
         column = "RepDays" if report else "Date"
         return self.cdf[column].max()
 
+    # ----------------------------------------------------------------------------------------------------------------
+    # Memory
+
+    def publish(self, snapdir, keep=2, initial=False) :
+        """
+        Publish cdf as a memory mapped snapshot, other processes can attach it read-only
+        without copy (see SnapshotGeoCoronaData)
+        
+        Arguments:
+            snapdir {[str]} -- [Snapshot directory]
+        
+        Keyword Arguments:
+            keep {int} -- [Number of generations kept on disk] (default: {2})
+            initial {bool} -- [Only publish if nothing has been published in snapdir yet] (default: {False})
+        
+        Returns:
+            [int] -- [Snapshot generation, None if initial and a generation already exists]
+        """
+
+        return snapshot.publish(self.cdf, snapdir, keep=keep, logger=self.logger, initial=initial)
+
+    @staticmethod
+    def compact_cdf(cdf, float32=False) :
+        """
+        cdf with compact dtypes : categorical text columns, datetime64 dates
+        and the narrowest integer type able to hold each integer column
+        
+        Arguments:
+            cdf {[pd.DataFrame]} -- [cdf]
+        
+        Keyword Arguments:
+            float32 {bool} -- [Also store float columns (rates, per 10K) as float32] (default: {False})
+        
+        Returns:
+            [pd.DataFrame] -- [Compact cdf]
+        """
+
+        columns = {}
+        for column in cdf.columns :
+            values = cdf[column]
+
+            if column == "Date" : values = pd.to_datetime(values)
+            elif values.dtype == object : values = values.astype("category")
+            elif pd.api.types.is_integer_dtype(values) : values = pd.to_numeric(values, downcast="integer")
+            elif float32 and pd.api.types.is_float_dtype(values) : values = values.astype(np.float32)
+
+            columns[column] = values
+
+        return pd.DataFrame(columns, index=cdf.index, columns=cdf.columns)
+
+    def memory_usage(self) :
+        # (object, column, dtype, bytes) for cdf columns and derived structures
+        usage = [("cdf", column, str(self.cdf[column].dtype) if column in self.cdf else "", size)
+            for column, size in self.cdf.memory_usage(deep=True).items()]
+        
+        usage.append(("indexes", "", "", sum(index.nbytes() for index in self._indexes.values())))
+        return usage
+
+    def memory_report(self) :
+        """
+        Memory used by each cdf column and by data structures derived from cdf
+        
+        Returns:
+            [pd.DataFrame] -- [Object, Column, Dtype and Bytes columns, with a total row]
+        """
+
+        report = pd.DataFrame(self.memory_usage(), columns=["Object", "Column", "Dtype", "Bytes"])
+        total = pd.DataFrame([("total", "", "", report["Bytes"].sum())], columns=report.columns)
+        return pd.concat((report, total), ignore_index=True)
+
     # ----------------------------------------------------------------------------------------------------------------
     # Data generation
 
     @staticmethod
-    def repDays(days) :
+    def repDays(days, first=None) :
         days = pd.to_datetime(days).dt.date
-        return (days - days.min() + pd.Timedelta('1 days')).dt.days
+        first = days.min() if first is None else pd.Timestamp(first).date()
+        return (days - first + pd.Timedelta('1 days')).dt.days
 
     @staticmethod
-    def load_from_time_serie(url, logger=None) :
-        if logger : logger.info(f"Fetch from : {url}")
+    def load_from_time_serie(url, logger=None, content=None, dates=None) :
         name = bname(url).split("_")[3].title()
 
-        df = pd.read_csv(url, sep=",")
-        df = pd.melt(df, id_vars=df.columns[:4], value_vars=df.columns[4:], var_name="date", value_name=name)
+        if content is None :
+            if logger : logger.info(f"Fetch from : {url}")
+            df = pd.read_csv(url, sep=",")
+        else :
+            df = pd.read_csv(io.BytesIO(content), sep=",")
+
+        return CoronaData.melt_time_serie(df, name, dates)
+
+    @staticmethod
+    def melt_time_serie(df, name, dates=None) :
+        # dates : subset of date columns to keep, all if None
+        value_vars = df.columns[4:] if dates is None else [column for column in df.columns[4:] if column in dates]
+        df = pd.melt(df, id_vars=df.columns[:4], value_vars=value_vars, var_name="date", value_name=name)
         df.columns = [column.title() for column in df.columns]
 
         return df
 
     @staticmethod
-    def names_time_serie() :
-        return [bname(url).split("_")[3].title() for url in TIME_SERIES]
+    def read_time_series(logger=None, sources=None, fetcher=None) :
+        # Raw (wide) dataframes, one for each source
+        sources = sources or TIME_SERIES
+        fetcher = fetcher or fetch.Fetcher(logger=logger)
+        return [pd.read_csv(io.BytesIO(content), sep=",") for content in fetcher.fetch_all(sources)]
 
     @staticmethod
-    def corona_data_from_time_series(logger=None, correct=True, strip=True) :
-        data = [GeoCoronaData.load_from_time_serie(url, logger) for url in TIME_SERIES]
-        df = data.pop(0)
+    def iter_time_series(logger=None, sources=None, fetcher=None, frames=None, dates=None, chunk=30) :
+        """
+        Wide time series split by groups of date columns, one group is read at once
+        Each group contains all locations, so long format chunks never share a (location, date) key
+
+        Keyword Arguments:
+            logger {[logging.Logger]} -- [Logger] (default: {None})
+            sources {[str list]} -- [Confirmed, deaths and recovered time series] (default: {TIME_SERIES})
+            fetcher {[fetch.Fetcher]} -- [Fetcher used to download time series] (default: {None})
+            frames {[pd.DataFrame list]} -- [Wide time series already loaded, fetched if None] (default: {None})
+            dates {[set]} -- [Subset of date columns to keep, all if None] (default: {None})
+            chunk {int} -- [Number of date columns by group] (default: {30})
 
-        while data :
-            df = df.merge(data.pop(0), on=list(df.columns[:5]), how="outer")
+        Returns:
+            [generator] -- [Wide dataframes (one for each source) with location columns and one group of dates]
+        """
+
+        if frames is None :
+            fetcher = fetcher or fetch.Fetcher(logger=logger)
+            contents = fetcher.fetch_all(sources or TIME_SERIES)
+            headers = [pd.read_csv(io.BytesIO(content), sep=",", nrows=0).columns for content in contents]
+            read = lambda idx, columns : pd.read_csv(io.BytesIO(contents[idx]), sep=",", usecols=columns)
+        else :
+            headers = [df.columns for df in frames]
+            read = lambda idx, columns : frames[idx][columns]
 
-        for name in CoronaData.names_time_serie() :
-            df[name] = df[name].fillna(0).astype(int)
+        columns = set().union(* (header[4:] for header in headers))
+        if dates is not None : columns &= set(dates)
+        columns = sorted(columns, key=lambda date : pd.to_datetime(date))
+
+        # At least one group, even without date
+        for start in range(0, max(len(columns), 1), chunk) :
+            selected = set(columns[start:start + chunk])
+            yield [read(idx, list(header[:4]) + [column for column in header[4:] if column in selected])
+                for idx, header in enumerate(headers)]
+
+    @staticmethod
+    def names_time_serie(sources=None) :
+        return [bname(url).split("_")[3].title() for url in sources or TIME_SERIES]
+
+    @staticmethod
+    def corona_data_from_time_series(logger=None, correct=True, strip=True, sources=None, fetcher=None, frames=None, dates=None) :
+        sources = sources or TIME_SERIES
+
+        if frames is None and fetcher is None :
+            frames = []
+            for url in sources :
+                if logger : logger.info(f"Fetch from : {url}")
+                frames.append(pd.read_csv(url, sep=","))
+
+        elif frames is None :
+            frames = CoronaData.read_time_series(logger, sources, fetcher)
+
+        names = CoronaData.names_time_serie(sources)
+        df = CoronaData.join_time_series(frames, names, dates)
 
         if correct :
             df = CoronaData.manual_correction(df)
 
         if strip :
-            names = CoronaData.names_time_serie()
+            names = CoronaData.names_time_serie(sources)
             df = df[df[names].sum(axis=1) != 0]
 
         return df
 
+    @staticmethod
+    @instrument.stage("merge")
+    def join_time_series(frames, names, dates=None, fill=0) :
+        """
+        Long format dataframe with one column for each time serie, joined on location and date
+        Each location gets an integer ID shared by all series, values are aligned once
+        in a (location, date, serie) array instead of merging series on float coordinates
+        
+        Arguments:
+            frames {[pd.DataFrame list]} -- [Wide time series, location columns followed by date columns]
+            names {[str list]} -- [Name of each serie]
+        
+        Keyword Arguments:
+            dates {[set]} -- [Subset of date columns to keep, all if None] (default: {None})
+            fill {int} -- [Value used when a location or a date is missing from a serie, or when a value is empty] (default: {0})
+        
+        Returns:
+            [pd.DataFrame] -- [Location columns, Date and one integer column by serie, for each (location, date) found in at least one serie]
+        """
+
+        ids = [column.title() for column in frames[0].columns[:4]]
+        locations = pd.concat([df.iloc[:, :4].set_axis(ids, axis=1) for df in frames], ignore_index=True)
+
+        # Same float coordinates and names give the same ID, missing province included
+        codes = locations.groupby(ids, dropna=False, sort=False).ngroup().to_numpy()
+        first = np.unique(codes, return_index=True)[1]
+        locations = locations.iloc[first].reset_index(drop=True)
+
+        columns = [[column for column in df.columns[4:] if dates is None or column in dates] for df in frames]
+        alldates = pd.Index(set().union(* columns), dtype=object)
+        alldates = alldates[np.argsort(pd.to_datetime(alldates).to_numpy(), kind="mergesort")]
+        dindex = {date : idx for idx, date in enumerate(alldates)}
+
+        values = np.full((len(locations), len(alldates), len(frames)), np.nan)
+        present = np.zeros((len(locations), len(alldates)), dtype=bool)
+
+        start = 0
+        for idx, (df, dcolumns) in enumerate(zip(frames, columns)) :
+            rows = codes[start:start + len(df)]
+            start += len(df)
+
+            data = df[dcolumns].to_numpy(dtype=float)
+
+            # Duplicated locations within a serie are summed
+            if len(np.unique(rows)) < len(rows) :
+                data = pd.DataFrame(data).groupby(rows).sum(min_count=1)
+                rows, data = data.index.to_numpy(), data.to_numpy()
+
+            didx = np.array([dindex[column] for column in dcolumns], dtype=int)
+            values[rows[:, None], didx[None, :], idx] = data
+            present[rows[:, None], didx[None, :]] = True
+
+        lidx, didx = np.nonzero(present)
+        df = locations.iloc[lidx].reset_index(drop=True)
+        df["Date"] = alldates.to_numpy()[didx]
+
+        for idx, name in enumerate(names) :
+            df[name] = np.nan_to_num(values[lidx, didx, idx], nan=fill).astype(int)
+
+        return df
+
     @staticmethod
     def manual_correction(cdf) :
         cdf = cdf[cdf["Province/State"] != "Recovered"]
@@ -185,6 +483,7 @@ class CoronaData() :
             [str] -- [Country where the location is found, else np.nan]
         """
 
+        from shapely.geometry import Point
         point = Point(lon, lat)
 
         if guess in gdf and gdf[guess].contains(point) :
@@ -195,31 +494,112 @@ class CoronaData() :
                 return country
         return np.nan
 
+    @staticmethod
+    def find_countries_lon_lat(gdf, lons, lats, guesses=None) :
+        """
+        Find country names for several longitude and latitude values at once
+        Polygons are indexed once and all points are resolved with a single spatial join
+        Results are the same than calling find_country_lon_lat for each location
+        
+        Arguments:
+            gdf {dict} -- [{country : polygone} dictionary]
+            lons {[float list]} -- [Longitudes]
+            lats {[float list]} -- [Latitudes]
+        
+        Keyword Arguments:
+            guesses {[str list]} -- [Countries where each location is most likely found] (default: {None})
+        
+        Returns:
+            [pd.Series] -- [Country where each location is found, else np.nan]
+        """
+
+        import geopandas as gpd
+
+        lons, lats = np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+        guesses = np.asarray(guesses, dtype=object) if guesses is not None else np.full(len(lons), np.nan, dtype=object)
+
+        polygones = gpd.GeoDataFrame({"Country" : list(gdf.keys()), "geometry" : list(gdf.values())})
+        points = gpd.GeoDataFrame({"Guess" : guesses}, geometry=gpd.points_from_xy(lons, lats))
+
+        # sjoin builds a spatial index over the polygones and uses prepared geometries
+        matches = gpd.sjoin(points, polygones, how="inner", predicate="within")
+
+        # Guess first, then polygones order like the dictionary walk of find_country_lon_lat
+        matches["Priority"] = np.where(matches["Country"] == matches["Guess"], -1, matches["index_right"])
+        matches = matches.sort_values("Priority", kind="mergesort")
+        found = matches[~ matches.index.duplicated()]["Country"]
+
+        return found.reindex(range(len(lons)))
+
+    @instrument.stage("add_time_recovery_active_cdf")
     def add_time_recovery_active_cdf(self, cdf, rtime) :
         # Since Hopkins add (again) the recovered number
         # add_recovery_time_cdf is no longer needed 
 
+        # Compact integer columns are widened, sums and daily differences may not fit their narrow dtype
+        cdf = cdf.astype({column : np.int64 for column in cdf.columns if pd.api.types.is_integer_dtype(cdf[column])})
+
         cdf["Date"] = pd.to_datetime(cdf["Date"], infer_datetime_format=True).dt.date
-        if rtime is not None : cdf = add_recovery_time_cdf(cdf, rtime)
+        if rtime is not None : cdf = self.add_recovery_time_cdf(cdf, rtime)
         cdf["Active"] = cdf["Confirmed"] - (cdf["Deaths"] + cdf["Recovered"])
 
         return cdf
 
-    def add_recovery_time_cdf(self, cdf, rtime) :
+    def lagged_values(self, cdf, columns, lag) :
+        """
+        Values of the same gb group, lag report days before each row
+        Same result than a left merge on gb + RepDays with RepDays shifted by lag,
+        missing days give NaN
+        
+        Arguments:
+            cdf {[pd.DataFrame]} -- [DataFrame with gb and RepDays columns]
+            columns {[str list]} -- [Columns to lag]
+            lag {[int]} -- [Number of report days]
+        
+        Returns:
+            [pd.DataFrame] -- [Lagged values (float), same index than cdf]
+        """
 
-        subdf = cdf.copy()
-        subdf["RepDays"] = subdf["RepDays"] + rtime
+        if cdf.empty :
+            return pd.DataFrame(np.nan, index=cdf.index, columns=columns)
 
-        columns = self.gb + ["RepDays", "Confirmed"]
-        subdf = subdf[columns]
-        
-        columns = self.gb + ["RepDays", "Recovered"]
-        subdf.columns = columns
+        rows, found = self.lagged_rows(cdf, [lag])
 
-        columns = self.gb + ["RepDays"]
-        cdf = cdf.merge(subdf, on=columns, how="left")
+        lagged = {}
+        for column in columns :
+            values = cdf[column].to_numpy(dtype=float)[rows[0]]
+            values[~ found[0]] = np.nan
+            lagged[column] = values
+
+        return pd.DataFrame(lagged, index=cdf.index, columns=columns)
+
+    def lagged_rows(self, cdf, lags) :
+        # Position of the row of the same gb group, lag report days before, for each lag
+        # Returns (rows, found) arrays of shape (len(lags), len(cdf)), rows are meaningless when not found
+        lags = np.asarray(lags, dtype=np.int64)
+
+        # One integer key for each (group, report day), groups are spaced so that
+        # a key minus lag can not fall into the previous group
+        codes = cdf.groupby(self.gb, dropna=False, observed=True).ngroup().to_numpy(dtype=np.int64)
+        days = cdf["RepDays"].to_numpy(dtype=np.int64)
+        span = days.max() - min(days.min(), 0) + np.abs(lags).max() + 1
+        keys = codes * span + days
 
-        cdf["Recovered"] = cdf["Recovered"] - cdf["Deaths"]
+        # Cdf from generate_cdf is already sorted by gb and RepDays
+        if np.all(keys[1:] > keys[:-1]) : order = np.arange(len(keys))
+        else : order = np.argsort(keys, kind="mergesort")
+
+        skeys = keys[order]
+        targets = keys[None, :] - lags[:, None]
+        positions = np.minimum(np.searchsorted(skeys, targets), len(skeys) - 1)
+        return order[positions], skeys[positions] == targets
+
+    def add_recovery_time_cdf(self, cdf, rtime) :
+        # Recovered cases are the confirmed cases of rtime days before, minus deaths
+        confirmed = self.lagged_values(cdf, ["Confirmed"], rtime)["Confirmed"].to_numpy()
+
+        cdf = cdf.reset_index(drop=True)
+        cdf["Recovered"] = confirmed - cdf["Deaths"]
         cdf["Recovered"] = cdf["Recovered"].fillna(0).astype(int)
         
         # Maybe this line should be added
@@ -230,25 +610,73 @@ class CoronaData() :
 
         return cdf
 
-    def add_daily_cases_cdf(self, cdf) :
-        subdf = cdf.copy()
-        subdf["RepDays"] = subdf["RepDays"] + 1
+    def recovery_time_variants(self, rtimes, as_columns=False) :
+        """
+        Recovered, Active, REDay and LRate estimated for several recovery times in one pass
+        Values are the same than the ones obtained with set_recovery_time, without modifying cdf
+        
+        Arguments:
+            rtimes {[int list]} -- [Recovery times]
+        
+        Keyword Arguments:
+            as_columns {bool} -- [Return cdf with extra columns suffixed by rtime (i.e Recovered_14) instead of a dict] (default: {False})
+        
+        Returns:
+            [dict or pd.DataFrame] -- [{rtime : DataFrame with cdf index} or cdf with extra columns]
+        """
 
-        columns = ["Confirmed", "Recovered", "Deaths"]
-        columns_old = [column + "Old" for column in columns]
+        rtimes = list(rtimes)
+        variants = self.compute_recovery_time_variants(self.cdf, rtimes)
+
+        if not as_columns : return variants
 
-        mcolumns = self.gb + ["RepDays"]
-        subdf = subdf[mcolumns + columns]
+        columns = {f"{column}_{rtime}" : values for rtime, variant in variants.items() for column, values in variant.items()}
+        return pd.concat((self.cdf, pd.DataFrame(columns, index=self.cdf.index)), axis=1)
 
-        cdf = cdf.merge(subdf, on=mcolumns, suffixes=("", "Old"), how="left")
-        cdf[columns_old] = cdf[columns_old].fillna(0).astype(int)
+    def compute_recovery_time_variants(self, cdf, rtimes) :
+        columns = ["Recovered", "Active", "REDay", "LRate"]
+        if cdf.empty or not rtimes :
+            return {rtime : pd.DataFrame(columns=columns, index=cdf.index) for rtime in rtimes}
 
-        for idx, column in enumerate(columns_old) :
+        confirmed = cdf["Confirmed"].to_numpy(dtype=np.int64)
+        deaths = cdf["Deaths"].to_numpy(dtype=np.int64)
+
+        # Last row is the previous report day, used for REDay
+        rows, found = self.lagged_rows(cdf, rtimes + [1])
+
+        lagged = np.where(found[:-1], confirmed[rows[:-1]], 0)
+        recovered = np.where(found[:-1], lagged - deaths, 0)
+        previous = np.where(found[-1], recovered[:, rows[-1]], 0)
+
+        with np.errstate(divide="ignore", invalid="ignore") :
+            lrate = deaths / (deaths + recovered)
+
+        variants = {}
+        for idx, rtime in enumerate(rtimes) :
+            variants[rtime] = pd.DataFrame({
+                "Recovered" : recovered[idx],
+                "Active" : confirmed - (deaths + recovered[idx]),
+                "REDay" : recovered[idx] - previous[idx],
+                "LRate" : np.nan_to_num(lrate[idx], nan=0, posinf=np.inf, neginf=-np.inf)
+                }, index=cdf.index, columns=columns)
+
+        return variants
+
+    @instrument.stage("add_daily_cases_cdf")
+    def add_daily_cases_cdf(self, cdf) :
+        columns = ["Confirmed", "Recovered", "Deaths"]
+        previous = self.lagged_values(cdf, columns, 1).fillna(0).astype(int)
+
+        # New frame with a fresh index, like the left merge used before
+        cdf = cdf.reset_index(drop=True)
+
+        for column in columns :
             nname = column[:2].upper() + "Day"
-            cdf[nname] = cdf[columns[idx]] - cdf[column]
+            cdf[nname] = cdf[column] - previous[column].to_numpy()
 
-        return cdf.drop(columns_old, axis=1)
+        return cdf
 
+    @instrument.stage("add_stats_cdf")
     def add_stats_cdf(self, cdf) :
         # Lethality rates
         cdf["LRate"] = cdf["Deaths"] / cdf[["Deaths", "Recovered"]].sum(axis=1)
@@ -256,16 +684,43 @@ class CoronaData() :
 
         return cdf
 
-    def generate_cdf(self) :
-        cdf = GeoCoronaData.corona_data_from_time_series(self.logger)
-        
+    def load_time_series(self) :
+        return self.read_time_series(self.logger, self.sources, self.fetcher)
+
+    def fetch_cdf(self, frames=None, dates=None) :
+        return self.corona_data_from_time_series(self.logger, sources=self.sources, fetcher=self.fetcher, frames=frames, dates=dates)
+
+    def iter_cdf(self, frames=None, dates=None) :
+        # Joined long format data, by groups of date columns with chunk
+        if not self.chunk :
+            yield self.fetch_cdf(frames, dates)
+            return
+
+        for cframes in self.iter_time_series(self.logger, self.sources, self.fetcher, frames, dates, self.chunk) :
+            yield self.fetch_cdf(cframes)
+
+    @staticmethod
+    def concat_chunks(chunks) :
+        # Empty chunks are ignored since their dtypes can differ
+        chunks = [cdf for cdf in chunks if not cdf.empty] or chunks[:1]
+        if len(chunks) == 1 : return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
+
+    @instrument.stage("groupby")
+    def group_time_series(self, cdf, columns) :
+        names = CoronaData.names_time_serie(self.sources)
+        return cdf.groupby(columns)[names].sum().astype(int).reset_index()
+
+    def aggregate_cdf(self, cdf, missing) :
         # We groupby geocols and date
-        columns = self.gb + ["Date"]
+        return self.group_time_series(cdf, self.gb + ["Date"])
 
-        names = CoronaData.names_time_serie()
-        cdf = cdf.groupby(columns)[names].sum().astype(int).reset_index()
+    def generate_cdf(self, frames=None, dates=None, first=None) :
+        # Each chunk is aggregated before reading the next one
+        missing = set()
+        cdf = self.concat_chunks([self.aggregate_cdf(cdf, missing) for cdf in self.iter_cdf(frames, dates)])
         
-        cdf["RepDays"] = GeoCoronaData.repDays(cdf["Date"])
+        cdf["RepDays"] = GeoCoronaData.repDays(cdf["Date"], first)
 
         columns = self.gb + ["RepDays"]
         cdf = cdf.sort_values(columns)
@@ -275,8 +730,12 @@ class CoronaData() :
 class GeoCoronaData(CoronaData) :
 
     GEOCOLS = {"Country", "Continent", "SubRegion", "REGION_WB", "REGION_UN", "ADM0_A3"}
+    SUMMABLE = ["Confirmed", "Deaths", "Recovered", "CODay", "REDay", "DEDay", "Active"]
 
-    def __init__(self, geofile=None, rtime=None, logger=None, head=0) :
+    # Simplification tolerances (degrees) usable by name
+    TOLERANCES = {"fine" : 0.01, "medium" : 0.05, "coarse" : 0.2}
+
+    def __init__(self, geofile=None, rtime=None, logger=None, head=0, cachedir=None, sources=None, fetcher=None, cube=False, compact=False, float32=False, chunk=None, detail=10, query_cache=0, query_ttl=None) :
         """        
         Object containing both corona data and geographic information
         All data are from a geo
@@ -286,85 +745,297 @@ class GeoCoronaData(CoronaData) :
             rtime {int} -- [average infection time allowing to estimate the number of recovered cases] (default: {14})
             logger {[logging.Logger]} -- [logger] (default: {None})
             head {int} -- [Number of row if a subset is needed (dataframe.head)] (default: {0})
+            cachedir {[str]} -- [Directory where resolved coordinates and time series are cached] (default: {None})
+            sources {[str list]} -- [Confirmed, deaths and recovered time series (url, file:// url or path)] (default: {TIME_SERIES})
+            fetcher {[fetch.Fetcher]} -- [Fetcher used to download time series] (default: {None})
+            cube {bool} -- [Answer data_from_day and data_from_geocol with a dense array backend] (default: {False})
+            compact {bool} -- [Store cdf with compact dtypes, dates are returned as datetime64] (default: {False})
+            float32 {bool} -- [With compact, store rates and per 10K columns as float32] (default: {False})
+            chunk {int} -- [Number of date columns processed at once, all at once if None] (default: {None})
+            detail {int} -- [Internal geodata detail used without geofile (10, 50 or 110)] (default: {10})
+            query_cache {int} -- [Number of data_from_day and data_from_geocol results kept, no cache if 0] (default: {0})
+            query_ttl {[datetime.timedelta]} -- [Maximum age of cached results] (default: {None})
         """
 
         self.logger = logger or logging.getLogger(utils.LOG_NAME)
         self.logger.debug("Create GeoCoronaData instance")
+
+        self._detail = detail
+
+        self._use_cube = cube
+        self._cube = None
+        self._rollups = {}
+        self._popsizes = {}
+        self._query_cache = QueryCache(query_cache, query_ttl) if query_cache else None
         
-        self.logger.debug("Load GDF")
-        self._gdf = self.load_gdf(geofile)
+        self.logger.debug("Load geographic attributes")
+        self._geofile = geofile or self.default_geofile()
+        self._custom_geofile = geofile
+        self._geocache = geocache.shared_cache(os.path.join(cachedir, "geodata") if cachedir else None, self.logger)
+        self._gdf = None
+        self._attributes = self.load_attributes()
+
+        self.logger.debug("Load coordinates cache")
+        self._coorcache = utils.CoorCache(self.coorcache_fname(cachedir), self.geofile, self.logger)
         
+        if fetcher is None :
+            fetcher = fetch.Fetcher(os.path.join(cachedir, "timeseries") if cachedir else None, logger=self.logger)
+
         self.logger.debug("Initiate primary CoronaData instance")
-        super().__init__(rtime=rtime, logger=logger, head=head, gb=["Country"])
+        super().__init__(rtime=rtime, logger=logger, head=head, gb=["Country"], sources=sources, fetcher=fetcher,
+            compact=compact, float32=float32, chunk=chunk)
 
     def allowed_gb(self) :
         return set(["Country"])
 
-    def load_gdf(self, geofile=None, default_detail=10) :
-        if geofile : return self.load_custom_gdf(geofile)
-        else : return self.load_internal_gdf(default_detail)
+    def load_gdf(self, geofile=None, default_detail=None, geometry=True) :
+        if geofile : return self.load_custom_gdf(geofile, geometry)
+        else : return self.load_internal_gdf(default_detail or self.detail, geometry)
     
-    def load_custom_gdf(self, geofile) :
+    def load_custom_gdf(self, geofile, geometry=True) :
+        import geopandas as gpd
         if geofile.endswith(".zip") : geofile = "zip:///" + geofile
-        return gpd.read_file(geofile)
+        return gpd.read_file(geofile, ignore_geometry=not geometry)
+
+    def load_internal_gdf(self, default_detail, geometry=True) :
+        import geopandas as gpd
 
-    def load_internal_gdf(self, default_detail) :
         columns = ['ADMIN', 'geometry', "ADM0_A3", "POP_EST", "CONTINENT", "REGION_UN", "SUBREGION", "REGION_WB"]
         renamed = {'ADMIN' :  'Country', 'POP_EST' : 'PopSize', 'CONTINENT' : 'Continent', 'SUBREGION' : 'SubRegion'}
+        if not geometry : columns.remove("geometry")
 
         fname = self.default_geofile(default_detail)
-        df = gpd.read_file(fname)[columns]
+        df = gpd.read_file(fname, ignore_geometry=not geometry)[columns]
         df.columns = [renamed.get(column, column) for column in columns]
         return df
 
-    def default_geofile(self, detail=10):
+    def default_geofile(self, detail=None):
+        detail = detail or self.detail
         return os.path.join(dname(rpath), "geodata", f"ne_{detail}m",
             f"ne_{detail}m_admin_0_countries.shp")
 
+    def load_attributes(self) :
+        # Attribute table without polygones, cached in binary form for each geofile
+        name = ["attributes", "custom" if self._custom_geofile else "internal"]
+        compute = lambda : self.load_gdf(self._custom_geofile, geometry=False)
+        return self.geocache.get(self.geofile, name, compute).copy()
+
     @property
     def gdf(self):
+        # Full geodata with polygones, only read when geometry is needed
+        if self._gdf is None :
+            self.logger.debug("Load GDF")
+            self._gdf = self.load_gdf(self._custom_geofile)
         return self._gdf
+
+    @property
+    def attributes(self):
+        # Countries information (population, regions) without polygones
+        return self._attributes
+
+    @property
+    def geocache(self):
+        return self._geocache
+
+    @property
+    def geofile(self):
+        return self._geofile
+
+    @property
+    def detail(self):
+        return self._detail
+
+    @property
+    def use_cube(self):
+        return self._use_cube
+
+    @property
+    def query_cache(self):
+        return self._query_cache
+
+    @property
+    def cube(self):
+        # Dense backend, built on first use for the current cdf
+        with self._lock :
+            if self._cube is None :
+                self.logger.debug("Build dense cube from cdf")
+                self._cube = CoronaCube(self.cdf, GeoCoronaData.SUMMABLE)
+            return self._cube
+
+    def clear_derived(self) :
+        super().clear_derived()
+        self._cube = None
+        self._rollups = {}
+        if self._query_cache is not None : self._query_cache.clear()
+
+    def cached_query(self, key, compute) :
+        # Results are keyed by data generation, a result computed during a cdf swap is never served
+        if self._query_cache is None : return compute()
+        return self._query_cache.fetch((self.generation,) + key, compute)
+
+    def memory_usage(self) :
+        usage = super().memory_usage()
+        usage.append(("attributes", "", "", self.attributes.memory_usage(deep=True).sum()))
+        if self._gdf is not None : usage.append(("gdf", "", "", self._gdf.memory_usage(deep=True).sum()))
+        if self._cube is not None : usage.append(("cube", "", "", self._cube.nbytes()))
+        for column, rollup in self._rollups.items() :
+            usage.append(("rollup", column, "", rollup.nbytes()))
+        return usage
+
+    def rollup(self, column) :
+        """
+        cdf summed by geocolumn, Date and RepDays
+        Computed once for each cdf, dropped when cdf is replaced
+        
+        Arguments:
+            column {[str]} -- [GeoColumn]
+        
+        Returns:
+            [Rollup] -- [Rollup with lookup by geocolumn value or report day]
+        """
+
+        with self._lock :
+            if column not in self._rollups :
+                self.logger.debug(f"Compute {column} rollup")
+                self._rollups[column] = Rollup(self.cdf, column, GeoCoronaData.SUMMABLE)
+            return self._rollups[column]
+
+    def popsizes(self, column) :
+        # Population size of each geocolumn value, geodata does not change
+        if column not in self._popsizes :
+            self._popsizes[column] = self.attributes.groupby(column)["PopSize"].sum()
+        return self._popsizes[column]
+
+    @property
+    def coorcache(self):
+        return self._coorcache
+
+    def coorcache_fname(self, cachedir=None) :
+        if cachedir is None : return None
+        os.makedirs(cachedir, exist_ok=True)
+        return os.path.join(cachedir, "coordinates.json")
     
-    def add_geom_light(self, cdf, column="Country") :
-        return self.add_geom(cdf, column, default_detail=110)
+    def add_geom_light(self, cdf, column="Country", tolerance=None) :
+        return self.add_geom(cdf, column, default_detail=110, tolerance=tolerance)
 
-    def add_geom(self, cdf, column="Country", geofile=None, default_detail=None) :
+    def add_geom(self, cdf, column="Country", geofile=None, default_detail=None, tolerance=None) :
         if column not in GeoCoronaData.GEOCOLS :
-            raise ValueError(f"Column '{geocol}' is not a allowed geo column : {GeoCoronaData.GEOCOLS}")
+            raise ValueError(f"Column '{column}' is not a allowed geo column : {GeoCoronaData.GEOCOLS}")
 
-        mapper = self.make_geo_mapper(column, geofile, default_detail)
-        cdf["geometry"] = cdf[column].map(mapper)
+        mapper = self.make_geo_mapper(column, geofile, default_detail, tolerance)
+        cdf["geometry"] = cdf[column].astype(object).map(mapper)
         return cdf
 
-    @lru_cache(maxsize=10)
-    def make_geo_mapper(self, column, geofile=None, default_detail=None) :
-        if geofile or default_detail : gdf = self.load_gdf(geofile=geofile, default_detail=default_detail) 
-        else : gdf = self.gdf
+    def make_geo_mapper(self, column, geofile=None, default_detail=None, tolerance=None) :
+        """
+        Geometry of each geocolumn value, polygones are merged for larger areas (i.e Continents)
+        Mappers are shared between instances and saved in the geo cache directory
+        
+        Arguments:
+            column {[str]} -- [GeoColumn]
+        
+        Keyword Arguments:
+            geofile {[str]} -- [Geofile to use instead of instance geodata] (default: {None})
+            default_detail {[int]} -- [Internal geodata detail to use instead of instance geodata (10, 50 or 110)] (default: {None})
+            tolerance {[float or str]} -- [Topology preserving simplification tolerance or name from TOLERANCES] (default: {None})
+        
+        Returns:
+            [GeoSeries] -- [Geometry for each geocolumn value]
+        """
+
+        tolerance = GeoCoronaData.TOLERANCES.get(tolerance, tolerance)
+
+        if geofile or default_detail :
+            path = geofile or self.default_geofile(default_detail)
+            load = lambda : self.load_gdf(geofile=geofile, default_detail=default_detail)
+        else :
+            geofile, path = self._custom_geofile, self.geofile
+            load = lambda : self.gdf
+
+        name = ["mapper", "custom" if geofile else "internal", column, tolerance]
+        compute = lambda : self.compute_geo_mapper(load(), column, tolerance)
+        return self.geocache.get(path, name, compute)
+
+    @staticmethod
+    def compute_geo_mapper(gdf, column, tolerance=None) :
+        from shapely.ops import unary_union
 
         # Merge polygones if needed, i.e Continents
         if column in ("Country", "ADM0_A3") :
             mapper = gdf.set_index(column)["geometry"]
         
         else :
+            # Invalid polygones are fixed on a copy, gdf is not modified
             # https://stackoverflow.com/questions/31391209/valueerror-no-shapely-geometry-can-be-created-from-null-value
-            gdf["geometry"] = [geom if geom.is_valid else geom.buffer(0) for geom in gdf["geometry"]]
-            mapper = gdf.groupby(column)["geometry"].apply(cascaded_union)
+            geometry = gdf["geometry"].apply(lambda geom : geom if geom.is_valid else geom.buffer(0))
+            mapper = geometry.groupby(gdf[column]).apply(unary_union)
+
+        if tolerance :
+            mapper = mapper.apply(lambda geom : geom.simplify(tolerance, preserve_topology=True))
 
         return mapper
 
     def df2gdf(self, cdf, * args, light=False, ** kwargs) :
+        import geopandas as gpd
         fun = self.add_geom_light if light else self.add_geom
         cdf = fun(cdf, * args, ** kwargs)
         return gpd.GeoDataFrame(cdf)
 
-    def save_geojson(self, fname, cdf, column) :
+    def save_geojson(self, fname, cdf, column, ** kwargs) :
         if not "geometry" in cdf.columns : 
             raise ValueError("geometry not found in dataframe, use add_geom function before")
     
-        gdf = self.df2gdf(cdf, column)
+        gdf = self.df2gdf(cdf, column, ** kwargs)
         self.logger.info(f"Save cdf to geojson at : {fname}")
         gdf.to_file(fname, driver='GeoJSON') 
 
+    def export_geojson(self, geometry, properties=None, column="Country", days=None, report=False, 
+        tolerance=None, default_detail=None, seq=False, table=False, batch=30) :
+        """
+        Export geometry once and values of each day apart, i.e for a time slider map
+        Features ids are geocolumn values, each property record has the id of its feature
+        Days are processed and written by batches, the whole history is never held in memory
+        
+        Arguments:
+            geometry {[str or file-like]} -- [Geometry output, file path or text file-like object]
+        
+        Keyword Arguments:
+            properties {[str or file-like]} -- [Per day values output, not written if None] (default: {None})
+            column {str} -- [GeoColumn] (default: {"Country"})
+            days {[list]} -- [Dates or report days, all days if None] (default: {None})
+            report {bool} -- [Use report day or date] (default: {False})
+            tolerance {[float or str]} -- [Simplification tolerance or name from TOLERANCES] (default: {None})
+            default_detail {[int]} -- [Internal geodata detail to use instead of instance geodata (10, 50 or 110)] (default: {None})
+            seq {bool} -- [Write geometry as GeoJSONSeq (one feature by line)] (default: {False})
+            table {bool} -- [Write values as a csv table instead of newline delimited json] (default: {False})
+            batch {int} -- [Number of days processed at once] (default: {30})
+        
+        Returns:
+            [tuple] -- [(number of features, number of property records)]
+
+        Raises:
+            ValueError -- [Raised when uncorrect geocolumn is provided]
+        """
+
+        self.check_geocolumn(column)
+
+        mapper = self.make_geo_mapper(column, default_detail=default_detail, tolerance=tolerance)
+        self.logger.info(f"Export {column} geometry to : {geometry}")
+        nfeatures = geoexport.write_geometry(geometry, mapper, column, seq=seq)
+        if properties is None : return nfeatures, 0
+
+        days = self.days(report) if days is None else [self.normalize_day(day, report) for day in days]
+        days = list(dict.fromkeys(days))
+
+        # Batches are not kept in the query cache, an export would evict all cached results
+        frames = (self.compute_data_from_days(days[start:start + batch], report, True, column, False)
+            for start in range(0, len(days), batch))
+
+        self.logger.info(f"Export {column} values for {len(days)} day(s) to : {properties}")
+        nrecords = geoexport.write_records(properties, frames, column, table=table)
+        return nfeatures, nrecords
+
+    @instrument.stage("order_cdf")
     def order_cdf(self, cdf) :
         order = ["Country", "ADM0_A3", "SubRegion", "REGION_WB", "Continent", "PopSize", "Date", "RepDays", "Confirmed", "Deaths",
                 "Recovered", "Active", "CODay", "REDay", "DEDay", "LRate", "PrcCont", "CO10K", "DE10K", "RE10K", "AC10K"]
@@ -381,49 +1052,111 @@ class GeoCoronaData(CoronaData) :
         cdf = self.add_PopInfo_cdf(cdf)
         return self.order_cdf(cdf)
 
+    @instrument.stage("add_PopInfo_cdf")
     def add_PopInfo_cdf(self, cdf) :
         columns = ["Confirmed", "Deaths", "Recovered", "Active"]
         cdf["PrcCont"] = cdf[columns[:3]].sum(axis=1) / cdf["PopSize"]
 
         for column in columns :
+            # float first : compact integer columns would overflow
             nname = column[:2].upper() + "10K"
-            cdf[nname] = cdf[column] * 10000 / cdf["PopSize"]
+            cdf[nname] = cdf[column].astype(float) * 10000 / cdf["PopSize"]
 
         return cdf
 
-    def generate_cdf(self) :
-        cdf = GeoCoronaData.corona_data_from_time_series(self.logger)
+    def compute_recovery_time_variants(self, cdf, rtimes) :
+        # Population based columns depending on recovered cases
+        variants = super().compute_recovery_time_variants(cdf, rtimes)
+
+        for variant in variants.values() :
+            variant["PrcCont"] = (cdf["Confirmed"] + cdf["Deaths"] + variant["Recovered"]) / cdf["PopSize"]
+            for column in ["Recovered", "Active"] :
+                nname = column[:2].upper() + "10K"
+                variant[nname] = variant[column].astype(float) * 10000 / cdf["PopSize"]
+
+        return variants
+
+    @staticmethod
+    def map_countries(cdf, cnames, unique_coor) :
+        """
+        Country of each row, using country name when found in cnames and coordinates otherwise
+        
+        Arguments:
+            cdf {[pd.DataFrame]} -- [DataFrame with Country/Region, Long and Lat columns]
+            cnames {[set]} -- [Known countries names]
+            unique_coor {[dict]} -- [{(longitude, latitude) : country} dictionary]
+        
+        Returns:
+            [pd.Series] -- [Country for each row, np.nan if not found]
+        """
+
+        countries = cdf["Country/Region"].where(cdf["Country/Region"].isin(cnames))
+        missing = countries.isna()
+
+        # NaN coordinates never match (several (nan, nan) keys can be found), duplicated keys are dropped
+        lookup = pd.DataFrame({
+            "Long" : pd.Series([coor[0] for coor in unique_coor], dtype=float),
+            "Lat" : pd.Series([coor[1] for coor in unique_coor], dtype=float),
+            "GCountry" : pd.Series(list(unique_coor.values()), dtype=object)
+            })
+        lookup = lookup.dropna(subset=["Long", "Lat"]).drop_duplicates(["Long", "Lat"])
+
+        # Left merge on unique keys : same rows, same order
+        found = cdf.loc[missing, ["Long", "Lat"]].astype(float).merge(lookup, on=["Long", "Lat"], how="left")
+        countries[missing] = found["GCountry"].values
 
+        return countries
+
+    @staticmethod
+    def as_datetime(dates) :
+        # datetime.date to datetime64 (midnight)
+        return pd.to_datetime(dates)
+
+    @instrument.stage("geo_resolve")
+    def resolve_coordinates(self, coordinates) :
+        # Only coordinates never seen with this geofile are searched within polygones
+        self.coorcache.check(self.geofile)
+        missing = self.coorcache.missing(coordinates)
+
+        if missing :
+            self.logger.debug(f"Resolve {len(missing)} new coordinates ({len(coordinates) - len(missing)} cached)")
+            gdfd = self.gdf.set_index("Country")["geometry"].to_dict()
+            lons, lats, guesses = zip(* missing)
+            found = GeoCoronaData.find_countries_lon_lat(gdfd, lons, lats, guesses)
+            self.coorcache.update(zip(missing, found))
+            self.coorcache.save()
+
+        return {coor[:2] : self.coorcache.get(coor, np.nan) for coor in coordinates}
+
+    def aggregate_cdf(self, cdf, missing) :
         # We confirm country using longitude and latitue
         # since gdf countries does not have the same name than cdf data
-        gdfd = self.gdf.set_index("Country")["geometry"].to_dict()
         unique_coor = set(zip(cdf["Long"], cdf["Lat"], cdf["Country/Region"]))
-        unique_coor = {coor[:2] : GeoCoronaData.find_country_lon_lat(gdfd, * coor)
-            for coor in unique_coor}
+        unique_coor = self.resolve_coordinates(unique_coor)
 
-        # We add country if country is found inside gdf
-        cnames = set(self.gdf["Country"])
-        cdf["GCountry"] = cdf["Country/Region"].apply(lambda x : x if x in cnames else np.nan)
-
-        # We map results and remove previous country column from cdf name
-        fun_mapping = lambda row : unique_coor[(row["Long"], row["Lat"])]
-        cdf.loc[cdf["GCountry"].isna(), "GCountry"] = cdf[cdf["GCountry"].isna()].apply(fun_mapping, axis=1)
+        # We add country if country is found inside gdf, else we map coordinates results
+        cnames = set(self.attributes["Country"])
+        cdf["GCountry"] = GeoCoronaData.map_countries(cdf, cnames, unique_coor)
 
         # Missing countries we were not able to found
-        missing = cdf[cdf["GCountry"].isna()]["Country/Region"].unique()
-        self.logger.warning(f"Countries not found within geodata (will be ignored) : {missing}")
+        missing.update(cdf[cdf["GCountry"].isna()]["Country/Region"].unique())
 
         # We group by country and date
-        columns = ["GCountry", "Date"]
-        names = CoronaData.names_time_serie()
-        cdf = cdf.groupby(columns)[names].sum().astype(int).reset_index()
+        cdf = self.group_time_series(cdf, ["GCountry", "Date"])
         cdf.columns = [{"GCountry" : "Country"}.get(column, column) for column in cdf.columns]
+        return cdf
+
+    def generate_cdf(self, frames=None, dates=None, first=None) :
+        # Each chunk is aggregated before reading the next one
+        missing = set()
+        cdf = self.concat_chunks([self.aggregate_cdf(cdf, missing) for cdf in self.iter_cdf(frames, dates)])
+        self.logger.warning(f"Countries not found within geodata (will be ignored) : {sorted(missing)}")
 
         # Add country info used by groupby
-        gdf = self.gdf[["Country", "PopSize", "Continent", "SubRegion", "REGION_WB", "ADM0_A3"]]
-        cdf = cdf.merge(gdf, on="Country", how="left")
+        attributes = self.attributes[["Country", "PopSize", "Continent", "SubRegion", "REGION_WB", "ADM0_A3"]]
+        cdf = cdf.merge(attributes, on="Country", how="left")
 
-        cdf["RepDays"] = GeoCoronaData.repDays(cdf["Date"])
+        cdf["RepDays"] = GeoCoronaData.repDays(cdf["Date"], first)
         cdf = cdf.sort_values(["Country", "RepDays"])
 
         return cdf
@@ -431,16 +1164,29 @@ class GeoCoronaData(CoronaData) :
     # ----------------------------------------------------------------------------------------------------------------
     # API like side
 
-    def fill_subdf_geo(self, subdf, column, filler={}) :
+    @staticmethod
+    def check_geocolumn(column) :
         if column not in GeoCoronaData.GEOCOLS :
             raise ValueError(f"Column '{column}' is not a allowed geo column : {GeoCoronaData.GEOCOLS}")
 
-        gdf = self.gdf.groupby(column)["PopSize"].sum().reset_index()
-        for key, value in filler.items() : gdf[key] = value
+    def fill_subdf_geo(self, subdf, column, filler={}) :
+        self.check_geocolumn(column)
+
+        columns = GeoCoronaData.SUMMABLE
+        subdf = subdf.groupby([column, "Date", "RepDays"], observed=True)[columns].sum().reset_index()
+        return self.fill_grouped_geo(subdf, column, filler)
+
+    def fill_grouped_geo(self, subdf, column, filler={}) :
+        # subdf is already grouped by column, Date and RepDays
+        # filler : values for all rows, or a DataFrame with one row by day (all geocolumn values for each day)
+        self.check_geocolumn(column)
 
-        columns = ["Confirmed", "Deaths", "Recovered", "CODay", "REDay", "DEDay", "Active"]
-        subdf = subdf.groupby([column, "Date", "RepDays"])[columns].sum().reset_index()
+        gdf = self.popsizes(column).reset_index()
+        if isinstance(filler, pd.DataFrame) : gdf = filler.merge(gdf, how="cross")
+        else : 
+            for key, value in filler.items() : gdf[key] = value
 
+        columns = GeoCoronaData.SUMMABLE
         subdf = gdf.merge(subdf, on=[column, "Date", "RepDays"], how="left")
         subdf[columns] = subdf[columns].fillna(0).astype(int)
         
@@ -449,6 +1195,44 @@ class GeoCoronaData(CoronaData) :
 
         return subdf
 
+    def geocol_rows(self, cdf, geocolumn, aggregate) :
+        # Rows of data_from_geocol(s) : population and stats for aggregated rows, 
+        # other geocolumns are removed from country rows
+        if aggregate :
+            cdf["PopSize"] = cdf[geocolumn].astype(object).map(self.popsizes(geocolumn))
+
+            cdf = self.add_stats_cdf(cdf)
+            cdf = self.add_PopInfo_cdf(cdf)
+
+        else :
+            columns = ["Country", "Continent", "SubRegion", "REGION_WB", "ADM0_A3"]
+            columns.remove(geocolumn)
+            cdf = cdf.drop(columns, axis=1)
+
+        return cdf
+
+    def fill_geocol_dates(self, cdf, geocolumn) :
+        # All dates for each location, rows already found are kept, not ordered
+        sdf = pd.DataFrame(pd.Series(self.days(), name="Date"))
+        sdf["RepDays"] = self.repDays(sdf["Date"])
+
+        found = cdf.drop_duplicates(geocolumn)
+        found = pd.DataFrame({geocolumn : found[geocolumn].astype(object), "PopSize" : found["PopSize"]})
+        sdf = found.merge(sdf, how="cross")
+
+        columns = list(set(cdf.columns) - set(sdf.columns))
+        for column in columns : sdf[column] = 0
+
+        cdf = pd.concat((cdf, sdf))
+        return cdf.drop_duplicates([geocolumn, "RepDays"])
+
+    def format_query(self, cdf, as_datetime) :
+        # Last step of each query
+        if as_datetime :
+            cdf["Date"] = self.as_datetime(cdf["Date"])
+
+        return self.order_cdf(cdf)
+
     def data_from_day(self, day=None, report=False, fill=False, geocolumn="Country", as_datetime=False) :
         """
         DataFrame for a given time
@@ -468,21 +1252,33 @@ class GeoCoronaData(CoronaData) :
         """
 
         column = "RepDays" if report else "Date"
-        day = day or self.cdf[column].max()
-        cdf = self.cdf[self.cdf[column] == day]
+        day = self.normalize_day(day or self.cdf[column].max(), report)
+
+        key = ("day", day, bool(report), bool(fill), geocolumn if fill else None, bool(as_datetime))
+        return self.cached_query(key, lambda : self.compute_data_from_day(day, report, fill, geocolumn, as_datetime))
+
+    def compute_data_from_day(self, day, report, fill, geocolumn, as_datetime) :
+        column = "RepDays" if report else "Date"
+
+        if self.use_cube :
+            cube = self.cube
+            didx = cube.day_index(day, report)
+            cdf = pd.DataFrame() if didx is None else cube.day_frame(didx)
+        else :
+            cdf = self.select_rows(column, day)
 
         if cdf.empty :
             raise ValueError(f"Nothing found for this date {day}")
 
         if fill : 
             filler = {"Date" : next(iter(cdf["Date"])), "RepDays" : next(iter(cdf["RepDays"]))}
-            cdf = self.fill_subdf_geo(cdf, geocolumn, filler=filler)
+            self.check_geocolumn(geocolumn)
 
-        if as_datetime :
-            transform_date = lambda date : datetime.combine(date, datetime.min.time())
-            cdf["Date"] = cdf["Date"].apply(transform_date)
+            if self.use_cube : grouped = cube.group_day(didx, geocolumn)
+            else : grouped = self.rollup(geocolumn).day(filler["RepDays"])
+            cdf = self.fill_grouped_geo(grouped, geocolumn, filler=filler)
 
-        return self.order_cdf(cdf)
+        return self.format_query(cdf, as_datetime)
 
     def data_from_geocol(self, select, geocolumn, fill=False, as_datetime=False) :
         """
@@ -503,56 +1299,196 @@ class GeoCoronaData(CoronaData) :
             ValueError -- [Raised when uncorrect geocolumn is provided]
         """
 
-        if geocolumn not in GeoCoronaData.GEOCOLS :
-            raise ValueError(f"Column '{geocolumn}' is not a allowed geo column : {GeoCoronaData.GEOCOLS}")
+        self.check_geocolumn(geocolumn)
+
+        key = ("geocol", select, geocolumn, bool(fill), bool(as_datetime))
+        return self.cached_query(key, lambda : self.compute_data_from_geocol(select, geocolumn, fill, as_datetime))
 
-        cdf = self.cdf[self.cdf[geocolumn] == select]
+    def compute_data_from_geocol(self, select, geocolumn, fill, as_datetime) :
+        aggregate = geocolumn not in ("Country", "ADM0_A3")
+
+        if self.use_cube :
+            cube = self.cube
+            if aggregate : cdf = cube.group_series(select, geocolumn)
+            else : cdf = cube.countries_frame(cube.country_indices(select, geocolumn))
+        elif aggregate :
+            cdf = self.rollup(geocolumn).select(select)
+        else :
+            cdf = self.select_rows(geocolumn, select)
 
         if cdf.empty :
             self.logger.info(f"Select value {select} not found in current cdf. Empty dataframe returned")
             return pd.DataFrame()
         
-        if geocolumn not in ("Country", "ADM0_A3") :
-            columns = ["Confirmed", "Deaths", "Recovered", "CODay", "REDay", "DEDay", "Active"]
-            cdf = cdf.groupby([geocolumn, "Date", "RepDays"])[columns].sum().reset_index()
-            
-            mapper = self.gdf.groupby(geocolumn)["PopSize"].sum()
-            cdf["PopSize"] = cdf[geocolumn].map(mapper)
+        cdf = self.geocol_rows(cdf, geocolumn, aggregate)
+        if fill : cdf = self.fill_geocol_dates(cdf, geocolumn).sort_values("RepDays")
 
-            cdf = self.add_stats_cdf(cdf)
-            cdf = self.add_PopInfo_cdf(cdf)
+        return self.format_query(cdf, as_datetime)
+
+    # ----------------------------------------------------------------------------------------------------------------
+    # Batch queries
+
+    def data_from_days(self, days=None, report=False, fill=False, geocolumn="Country", as_datetime=False) :
+        """
+        DataFrame for several times at once, with the rows data_from_day returns for each day
+        With fill, missing geocolumn values are added for all days with a single merge
+        
+        Keyword Arguments:
+            days {[list]} -- [Dates or report days (i.e a range), all days if None] (default: {None})
+            report {bool} -- [Use report day or date] (default: {False})
+            fill {bool} -- [Fill with missing geocolumn values] (default: {False})
+            geocolumn {str} -- [GeoColumn to pivot with] (default: {"Country"})
+            as_datetime {bool} -- [Convert date as datetime instead than datetime.dt] (default: {False})
+        
+        Returns:
+            [DataFrame] -- [Long DataFrame, rows ordered by day]
+
+        Raises:
+            ValueError -- [Raised when uncorrect geocolumn is provided or when no day is found]
+        """
+
+        if fill : self.check_geocolumn(geocolumn)
+
+        days = self.days(report) if days is None else [self.normalize_day(day, report) for day in days]
+        days = list(dict.fromkeys(days))
+
+        key = ("days", tuple(days), bool(report), bool(fill), geocolumn if fill else None, bool(as_datetime))
+        return self.cached_query(key, lambda : self.compute_data_from_days(days, report, fill, geocolumn, as_datetime))
+
+    def compute_data_from_days(self, days, report, fill, geocolumn, as_datetime) :
+        column = "RepDays" if report else "Date"
+
+        if fill :
+            frame = self.rollup(geocolumn).frame
+            cdf = frame[frame[column].isin(days)]
+
+            # One (Date, RepDays) row for each day found, in the requested order
+            order = {day : idx for idx, day in enumerate(days)}
+            filler = cdf[["Date", "RepDays"]].drop_duplicates(column)
+            filler = filler.iloc[np.argsort(filler[column].map(order).to_numpy(), kind="mergesort")]
 
         else :
-            columns = ["Country", "Continent", "SubRegion", "REGION_WB", "ADM0_A3"]
-            columns.remove(geocolumn)
-            cdf = cdf.drop(columns, axis=1)
+            with self._lock :
+                cdf, index = self.cdf, self.column_index(column)
+            cdf = cdf.iloc[np.concatenate([index.positions(day) for day in days] or [[]]).astype(int)]
+
+        if cdf.empty :
+            raise ValueError(f"Nothing found for these dates : {days}")
 
         if fill :
-            sdf = pd.DataFrame(pd.Series(self.days(), name="Date"))
-            sdf["RepDays"] = self.repDays(sdf["Date"])
-            sdf[geocolumn] = next(iter(cdf[geocolumn]))
-            sdf["PopSize"] = next(iter(cdf["PopSize"]))
+            missing = len(days) - len(filler)
+            if missing : self.logger.info(f"{missing} day(s) not found in current cdf, ignored")
+            cdf = self.fill_grouped_geo(cdf, geocolumn, filler=filler.reset_index(drop=True))
 
-            columns = list(set(cdf.columns) - set(sdf.columns))
-            for column in columns : sdf[column] = 0
+        return self.format_query(cdf.reset_index(drop=True), as_datetime)
 
-            cdf = pd.concat((cdf, sdf))
-            cdf = cdf.drop_duplicates("RepDays").sort_values("RepDays")
+    def iter_data_from_days(self, days=None, report=False, fill=False, geocolumn="Country", as_datetime=False) :
+        """
+        DataFrames for several times, one for each day, computed at once with data_from_days
+        
+        Keyword Arguments:
+            days {[list]} -- [Dates or report days (i.e a range), all days if None] (default: {None})
+            report {bool} -- [Use report day or date] (default: {False})
+            fill {bool} -- [Fill with missing geocolumn values] (default: {False})
+            geocolumn {str} -- [GeoColumn to pivot with] (default: {"Country"})
+            as_datetime {bool} -- [Convert date as datetime instead than datetime.dt] (default: {False})
+        
+        Returns:
+            [generator] -- [DataFrame for each day found, in the requested order]
+        """
 
-        if as_datetime :
-            transform_date = lambda date : datetime.combine(date, datetime.min.time())
-            cdf["Date"] = cdf["Date"].apply(transform_date)
+        cdf = self.data_from_days(days, report, fill, geocolumn, as_datetime)
+        column = "RepDays" if report else "Date"
 
-        return self.order_cdf(cdf)
+        for _, subdf in cdf.groupby(column, sort=False) :
+            yield subdf.reset_index(drop=True)
+
+    def data_from_geocols(self, selects, geocolumn, fill=False, as_datetime=False) :
+        """
+        DataFrame for several locations at once, with the rows data_from_geocol returns for each location
+        
+        Arguments:
+            selects {[list]} -- [Location values]
+            geocolumn {[str]} -- [GeoColumn to use]
+        
+        Keyword Arguments:
+            fill {bool} -- [Fill with missing dates] (default: {False})
+            as_datetime {bool} -- [Convert date as datetime instead than datetime.dt] (default: {False})
+        
+        Returns:
+            [DataFrame] -- [Long DataFrame, rows ordered by location then report day, empty if nothing is found]
+        
+        Raises:
+            ValueError -- [Raised when uncorrect geocolumn is provided]
+        """
+
+        self.check_geocolumn(geocolumn)
+
+        selects = list(dict.fromkeys(selects))
+        key = ("geocols", tuple(selects), geocolumn, bool(fill), bool(as_datetime))
+        return self.cached_query(key, lambda : self.compute_data_from_geocols(selects, geocolumn, fill, as_datetime))
+
+    def compute_data_from_geocols(self, selects, geocolumn, fill, as_datetime) :
+        aggregate = geocolumn not in ("Country", "ADM0_A3")
+
+        if aggregate :
+            rollup = self.rollup(geocolumn)
+            positions = [rollup.positions(select) for select in selects]
+            cdf = rollup.rows(np.concatenate(positions or [[]]).astype(int))
+        else :
+            with self._lock :
+                cdf, index = self.cdf, self.column_index(geocolumn)
+            positions = [index.positions(select) for select in selects]
+            cdf = cdf.iloc[np.concatenate(positions or [[]]).astype(int)]
+
+        missing = [select for select, position in zip(selects, positions) if not len(position)]
+        if missing : self.logger.info(f"Select values {missing} not found in current cdf, ignored")
+
+        if cdf.empty :
+            self.logger.info(f"Select values {selects} not found in current cdf. Empty dataframe returned")
+            return pd.DataFrame()
+
+        cdf = self.geocol_rows(cdf, geocolumn, aggregate)
+
+        if fill :
+            cdf = self.fill_geocol_dates(cdf, geocolumn)
+
+            order = {select : idx for idx, select in enumerate(selects)}
+            rank = cdf[geocolumn].astype(object).map(order).to_numpy()
+            cdf = cdf.iloc[np.lexsort((cdf["RepDays"].to_numpy(), rank))]
+
+        return self.format_query(cdf.reset_index(drop=True), as_datetime)
 
 class PersistantGeoCoronaData(GeoCoronaData) :
 
-    def __init__(self, * args, fname=None, utime=None, rtime=None, ** kwargs) :    
+    def __init__(self, * args, fname=None, utime=None, rtime=None, memory_map=False, snapdir=None, ** kwargs) :    
+        """
+        GeoCoronaData linked to a file, allowing to save and update data
+        File format is selected based on the file extension : 
+        csv (default), parquet (.parquet, .pq) or arrow IPC (.feather, .arrow, .ipc)
+        
+        Keyword Arguments:
+            fname {[str]} -- [File path, a temporary csv file is used if None] (default: {None})
+            utime {[datetime.timedelta]} -- [Time between two updates] (default: {None})
+            rtime {int} -- [Recovery time] (default: {None})
+            memory_map {bool} -- [Memory map the file when loading it] (default: {False})
+            snapdir {[str]} -- [Publish a snapshot of cdf in this directory after each update, and after loading if nothing is published yet] (default: {None})
+        """
+
+        self._snapdir = snapdir
+        self._refresher = None
+        self._identity = None
         self._fname = utils.TMPFname(ext="csv") if fname is None else fname
-        super().__init__(* args, rtime=rtime, ** kwargs)
+        self._storage = storage.storage_from_fname(self._fname, logger=kwargs.get("logger"))
+        self._memory_map = memory_map
+        self._signature = None
         self._rtime = rtime
+        super().__init__(* args, rtime=rtime, ** kwargs)
         self._watcher = utils.WatchFile(self.fname, utime=utime, logger=self.logger)
 
+        # Readers already attached to a generation are not swapped to the same data
+        if self.snapdir : self.publish(self.snapdir, initial=True)
+
     @property
     def fname(self):
         return str(self._fname)    
@@ -564,11 +1500,32 @@ class PersistantGeoCoronaData(GeoCoronaData) :
     @property
     def watcher(self):
         return self._watcher
+
+    @property
+    def storage(self):
+        return self._storage
+
+    @property
+    def snapdir(self):
+        return self._snapdir
     
     @property
     def istemp(self):
         return isinstance(self._fname, utils.TMPFname) 
 
+    @property
+    def signature_fname(self):
+        return self.fname + ".signature.json"
+
+    @property
+    def lock_fname(self):
+        return self.fname + ".lock"
+
+    def coorcache_fname(self, cachedir=None) :
+        # By default, resolved coordinates are saved next to the persistant file
+        if cachedir is not None or self.istemp : return super().coorcache_fname(cachedir)
+        return self.fname + ".coordinates.json"
+
     def check_inputs(self, * args, ** kwargs) :
         if isinstance(self._fname, utils.TMPFname) : 
             self.logger.info("Path not provided, generate a temporary file")
@@ -587,28 +1544,322 @@ class PersistantGeoCoronaData(GeoCoronaData) :
 
     def load_cdf(self, rtime, head=0) :
         if self.fname and os.path.isfile(self.fname) and not self.istemp :
-            df = pd.read_csv(self.fname)
-            df["Date"] = pd.to_datetime(df["Date"], infer_datetime_format=True).dt.date
+            self.logger.debug(f"Load cdf from file name : {self.fname}")
+            self._identity = utils.file_identity(self.fname)
+            df = self.read_file()
+            self._signature = self.load_signature()
             return df
 
         else :
-            return super().load_cdf(rtime, head)
+            frames = self.load_time_series()
+            self._signature = self.time_series_signature(frames)
+            return super().load_cdf(rtime, head, frames=frames)
 
+    @instrument.stage("load")
+    def read_file(self) :
+        return self.storage.read(self.fname, memory_map=self._memory_map)
+
+    def load_signature(self) :
+        if not os.path.isfile(self.signature_fname) : return None
+        with open(self.signature_fname) as f :
+            return json.load(f)
+
+    @instrument.stage("save", rows=lambda self : len(self.cdf))
     def save(self) :
         self.logger.debug(f"Save cdf to file name : {self.fname}")
-        self.cdf.to_csv(self.fname, index=False)
+        utils.replace_file(self.fname, lambda fname : self.storage.write(self.cdf, fname))
+        self._identity = utils.file_identity(self.fname)
+
+        # Written after the data : an older signature only leads to a full rebuild
+        if self._signature is not None and not self.istemp :
+            utils.replace_file(self.signature_fname, lambda fname : self.write_signature(fname))
+
+    def write_signature(self, fname) :
+        with open(fname, "w") as f :
+            json.dump(self._signature, f)
+
+    def file_changed(self) :
+        # File saved by another process since this instance loaded or saved it
+        # A temporary file belongs to this instance and is never loaded
+        if self.istemp : return False
+        return os.path.isfile(self.fname) and utils.file_identity(self.fname) != self._identity
+
+    def reload(self) :
+        """
+        Replace cdf by the file content, i.e after another process saved it
+        """
+
+        self.logger.info(f"Reload cdf from file name : {self.fname}")
+        self.set_cdf(self.load_cdf(self.rtime))
 
     def set_recovery_time(self, rtime) :
-        self.rtime = rtime
+        self._rtime = rtime
         super().set_recovery_time(rtime)
 
-    def update_cdf(self) :
-        self.logger.info(f"Run cdf update for {self}")
-        cdf = self.generate_cdf()
+    # ----------------------------------------------------------------------------------------------------------------
+    # Incremental update
+
+    def build_config(self) :
+        # Parameters the cdf is built with, rows built with other parameters can not be mixed with it
+        geofile = utils.CoorCache.geofile_identity(self.geofile) or str(self.geofile)
+        return {"rtime" : self.rtime, "geofile" : geofile, "detail" : self.detail, "sources" : list(self.sources)}
+
+    def time_series_signature(self, frames) :
+        # Hash of locations and of each date column, used to detect upstream history revisions
+        # Row hashes are digested in row order, each value is bound to its location
+        digest = lambda * arrays : hashlib.sha1(b"".join(array.tobytes() for array in arrays)).hexdigest()
+
+        series = {}
+        for name, df in zip(self.names_time_serie(self.sources), frames) :
+            ids = pd.util.hash_pandas_object(df[df.columns[:4]], index=False).to_numpy()
+            dates = {column : digest(ids, pd.util.hash_pandas_object(df[column], index=False).to_numpy()) for column in df.columns[4:]}
+            series[name] = {"ids" : digest(ids), "dates" : dates}
+
+        # Round trip through json, lists and tuples are compared equal with a saved signature
+        return json.loads(json.dumps({"config" : self.build_config(), "series" : series}))
+
+    def new_dates(self, signature) :
+        """
+        Date columns added upstream since the current cdf
+
+        Arguments:
+            signature {[dict]} -- [Signature of the last fetched time series]
+
+        Returns:
+            [list] -- [New date columns, None if a full rebuild is needed]
+        """
+
+        previous = self._signature
+
+        if previous is None or self.cdf.empty :
+            self.logger.info("No signature for current data, full rebuild needed")
+            return None
+
+        if previous.get("config") != signature["config"] :
+            self.logger.info("Recovery time, geodata or sources changed since current data, full rebuild needed")
+            return None
+
+        series, previous = signature["series"], previous["series"]
+        if set(series) != set(previous) :
+            self.logger.info("Time series changed, full rebuild needed")
+            return None
+
+        new = set()
+        for name, values in series.items() :
+            if values["ids"] != previous[name]["ids"] :
+                self.logger.info(f"Locations changed in {name} time serie, full rebuild needed")
+                return None
+
+            if any(values["dates"].get(date) != value for date, value in previous[name]["dates"].items()) :
+                self.logger.info(f"History revised in {name} time serie, full rebuild needed")
+                return None
+
+            new |= set(values["dates"]) - set(previous[name]["dates"])
+
+        new = sorted(new, key=lambda date : pd.to_datetime(date))
+        if new and pd.Timestamp(new[0]) <= pd.Timestamp(self.lastday()) :
+            self.logger.info("New dates found before last day, full rebuild needed")
+            return None
+
+        return new
+
+    def append_cdf(self, frames, dates) :
+        # One day before the first new date is needed for daily cases, plus rtime days for recovered estimation
+        lookback = 1 + (self.rtime or 0)
+
+        columns = sorted(set().union(* (df.columns[4:] for df in frames)), key=lambda date : pd.to_datetime(date))
+        start = max(columns.index(dates[0]) - lookback, 0)
+
+        cdf = self.generate_cdf(frames=frames, dates=set(columns[start:]), first=self.firstday())
         cdf = self.setup_cdf(cdf, self.rtime)
-        self._cdf = cdf
+
+        days = set(pd.to_datetime(dates).date)
+        cdf = cdf[cdf["Date"].isin(days)]
+        self.logger.info(f"Append {len(days)} new day(s) to cdf ({len(cdf)} rows)")
+
+        cdf = pd.concat((self.cdf, cdf), ignore_index=True)
+        return cdf.sort_values(["Country", "RepDays"]).reset_index(drop=True)
+
+    def update_cdf(self, incremental=True) :
+        """
+        Fetch and update the cdf
+        With incremental mode, only new dates are processed and appended to the current cdf
+        A full rebuild is done if upstream revised history or if the current data has no signature
+        
+        Keyword Arguments:
+            incremental {bool} -- [Only process new dates when possible] (default: {True})
+
+        Returns:
+            [pd.DataFrame] -- [Updated cdf]
+        """
+
+        self.logger.info(f"Run cdf update for {self}")
+        frames = self.load_time_series()
+        signature = self.time_series_signature(frames)
+
+        dates = self.new_dates(signature) if incremental else None
+
+        if dates is None :
+            cdf = self.generate_cdf(frames=frames)
+            cdf = self.setup_cdf(cdf, self.rtime)
+
+        elif not dates :
+            # Same data, derived structures and published snapshot are kept
+            self.logger.info("No new date found, cdf unchanged")
+            self._signature = signature
+            return self.cdf
+
+        else :
+            cdf = self.append_cdf(frames, dates)
+
+        self._signature = signature
+        self.set_cdf(cdf)
+        if self.snapdir : self.publish(self.snapdir)
+        return cdf
+
+    def update(self, wait=False, force=False) :
+        """
+        Update cdf if the file is outdated
+        When several processes share the same file, only one of them rebuilds and saves it,
+        the other ones reload the saved file
+        
+        Keyword Arguments:
+            wait {bool} -- [Wait for a process already updating instead of returning] (default: {False})
+            force {bool} -- [Update even if the file is not outdated] (default: {False})
+        
+        Returns:
+            [bool] -- [True if cdf has been replaced]
+        """
+
+        # Saved by another process, nothing to rebuild
+        if self.file_changed() :
+            self.reload()
+            return True
+
+        if not force and not self.watcher.check_update() : return False
+
+        with utils.FileLock(self.lock_fname, blocking=wait) as locked :
+            if not locked :
+                self.logger.info(f"Update already running in another process for : {self.fname}")
+                return False
+
+            # Another process may have saved the file while we were waiting for the lock
+            if self.file_changed() :
+                self.reload()
+                return True
+
+            self.update_cdf()
+            self.save()
+
+        return True
+
+    async def aupdate(self, wait=False, force=False, executor=None) :
+        """
+        Update without blocking the event loop, see update
+        
+        Keyword Arguments:
+            wait {bool} -- [Wait for a process already updating instead of returning] (default: {False})
+            force {bool} -- [Update even if the file is not outdated] (default: {False})
+            executor {[concurrent.futures.Executor]} -- [Thread executor, loop default executor if None] (default: {None})
+        
+        Returns:
+            [bool] -- [True if cdf has been replaced]
+        """
+
+        return await self.arun(self.update, wait=wait, force=force, executor=executor)
+
+    # ----------------------------------------------------------------------------------------------------------------
+    # Background refresh
+
+    @property
+    def refresher(self):
+        return self._refresher
+
+    def refresh(self) :
+        # cdf is swapped once the new one is ready
+        # False when another process holds the update lock, nothing is refreshed
+        return self.update(force=True)
+
+    def start_refresh(self, jitter=.1, backoff=2, max_delay=None) :
+        """
+        Refresh cdf every utime in a background thread
+        Queries keep using the previous cdf until the new one is ready
+        
+        Keyword Arguments:
+            jitter {float} -- [Random fraction of utime added or removed to each delay] (default: {.1})
+            backoff {float} -- [Delay multiplier after each consecutive failure] (default: {2})
+            max_delay {[datetime.timedelta]} -- [Maximum delay after failures] (default: {10 x utime})
+        
+        Returns:
+            [refresh.Refresher] -- [Running refresher]
+        """
+
+        if self._refresher is None :
+            self._refresher = refresh.Refresher(self.refresh, self.watcher.utime, first=self.watcher.next_update(),
+                jitter=jitter, backoff=backoff, max_delay=max_delay, logger=self.logger)
+
+        self._refresher.start()
+        return self._refresher
+
+    def stop_refresh(self, timeout=None) :
+        if self._refresher is not None : self._refresher.stop(timeout)
+
+    def refresh_stats(self) :
+        """
+        Background refresh information
+        
+        Returns:
+            [dict] -- [running, last_refresh, last_duration (seconds), next_refresh, failures and last_error]
+        """
+
+        if self._refresher is None : return {"running" : False}
+        return self._refresher.stats()
+
+class SnapshotGeoCoronaData(GeoCoronaData) :
+
+    def __init__(self, snapdir, * args, ** kwargs) :
+        """
+        GeoCoronaData attached read-only to a snapshot published by another process
+        (see CoronaData.publish or PersistantGeoCoronaData snapdir)
+        cdf columns are memory mapped, all attached processes share the same memory
+        Text columns are categorical and dates are datetime64, like with compact mode
+        
+        Arguments:
+            snapdir {[str]} -- [Snapshot directory]
+        """
+
+        self._snapdir = snapdir
+        self._snapshot_generation = None
+        super().__init__(* args, ** kwargs)
+
+    @property
+    def snapdir(self):
+        return self._snapdir
+
+    @property
+    def snapshot_generation(self):
+        return self._snapshot_generation
+
+    def load_cdf(self, rtime, head=0) :
+        self._snapshot_generation, cdf = snapshot.attach(self.snapdir, self.logger)
         return cdf
 
     def update(self) :
-        if self.watcher.check_update() :
-            self.update_cdf()
\ No newline at end of file
+        """
+        Attach the last published generation if it changed
+        
+        Returns:
+            [bool] -- [True if cdf has been replaced]
+        """
+
+        manifest = snapshot.read_manifest(self.snapdir)
+        if manifest is None or manifest["generation"] == self.snapshot_generation : return False
+
+        generation, cdf = snapshot.attach(self.snapdir, self.logger)
+        self._snapshot_generation = generation
+        self.set_cdf(cdf)
+        return True
+
+    async def aupdate(self, executor=None) :
+        # update without blocking the event loop
+        return await self.arun(self.update, executor=executor)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 14:41:18
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 14:41:18
+
+import numpy as np
+import pandas as pd
+
+class CoronaCube() :
+
+    """
+    Dense representation of a GeoCoronaData cdf : Country x RepDays x metric
+    Geographic columns are stored once per country, with integer codes for each geo level
+    Daily slices, country series and geo rollups are array slices and reductions
+    """
+
+    GEOCOLS = ["ADM0_A3", "SubRegion", "REGION_WB", "Continent"]
+
+    def __init__(self, cdf, summable) :
+        # summable : metrics summed by geo rollups (GeoCoronaData.SUMMABLE)
+        self.summable = list(summable)
+        self.columns = list(cdf.columns)
+        self.dtypes = cdf.dtypes
+        self.index = cdf.index
+
+        self.geocols = [column for column in CoronaCube.GEOCOLS if column in cdf.columns]
+        fixed = set(["Country", "Date", "RepDays", "PopSize"] + self.geocols)
+        self.metrics = [column for column in cdf.columns if column not in fixed]
+        self.mindex = {metric : idx for idx, metric in enumerate(self.metrics)}
+
+        # Countries and report days axis
+        ccodes, countries = pd.factorize(cdf["Country"], sort=True)
+        self.countries = pd.Index(countries, name="Country")
+
+        repdays = cdf["RepDays"].to_numpy()
+        self.first = repdays.min() if len(repdays) else 1
+        dcodes = repdays - self.first
+        ndays = dcodes.max() + 1 if len(dcodes) else 0
+
+        shape = (len(self.countries), ndays)
+        self.values = np.zeros(shape + (len(self.metrics), ), dtype=float)
+        self.values[ccodes, dcodes] = cdf[self.metrics].to_numpy(dtype=float)
+
+        self.present = np.zeros(shape, dtype=bool)
+        self.present[ccodes, dcodes] = True
+
+        # Position of each cell within the original cdf
+        self.positions = np.full(shape, -1, dtype=np.int64)
+        self.positions[ccodes, dcodes] = np.arange(len(cdf))
+
+        self.dates = np.empty(ndays, dtype=object)
+        self.dates[dcodes] = cdf["Date"].tolist()
+        self.dindex = {date : idx for idx, date in enumerate(self.dates) if date is not None}
+
+        # Country level information and geo levels codes
+        attributes = [column for column in ["PopSize"] + self.geocols if column in cdf.columns]
+        self.attributes = cdf.drop_duplicates("Country").set_index("Country")[attributes].reindex(self.countries)
+        self.groups = {"Country" : self.make_group(np.arange(len(self.countries)), self.countries)}
+        for column in self.geocols :
+            self.groups[column] = self.make_group(* pd.factorize(self.attributes[column], sort=True))
+
+    @staticmethod
+    def make_group(codes, names) :
+        # Countries ordered by group code, with start of each group for np.*.reduceat
+        # Countries without value for this geo level (code -1) are ignored
+        order = np.argsort(codes, kind="mergesort")
+        order = order[codes[order] >= 0]
+        scodes = codes[order]
+        starts = np.flatnonzero(np.r_[True, scodes[1:] != scodes[:-1]]) if len(scodes) else np.array([], dtype=int)
+        return {"order" : order, "starts" : starts, "names" : np.asarray(names, dtype=object)[scodes[starts]]}
+
+    def nbytes(self) :
+        return self.values.nbytes + self.present.nbytes + self.positions.nbytes
+
+    # ----------------------------------------------------------------------------------------------------------------
+    # Axis
+
+    def day_index(self, day, report=False) :
+        if report :
+            idx = int(day) - self.first
+            return idx if 0 <= idx < len(self.dates) and self.present[:, idx].any() else None
+
+        return self.dindex.get(day)
+
+    def country_indices(self, select, geocolumn="Country") :
+        if geocolumn == "Country" :
+            idx = self.countries.get_indexer([select])
+        else :
+            idx = np.flatnonzero((self.attributes[geocolumn] == select).to_numpy())
+        return idx[idx >= 0]
+
+    # ----------------------------------------------------------------------------------------------------------------
+    # DataFrames
+
+    def frame(self, cidx, didx) :
+        # cdf rows for (country, day) cells, cells must be present
+        data = {}
+        for column in self.columns :
+            if column == "Country" : values = self.countries.to_numpy()[cidx]
+            elif column in self.attributes : values = self.attributes[column].to_numpy()[cidx]
+            elif column == "Date" : values = self.dates[didx]
+            elif column == "RepDays" : values = didx + self.first
+            else : values = self.values[cidx, didx, self.mindex[column]]
+            data[column] = self.astype(values, self.dtypes[column])
+
+        index = self.index[self.positions[cidx, didx]]
+        return pd.DataFrame(data, index=index, columns=self.columns, copy=False)
+
+    @staticmethod
+    def astype(values, dtype) :
+        if isinstance(dtype, np.dtype) : return values.astype(dtype, copy=False)
+        return pd.Series(values).astype(dtype).array
+
+    def day_frame(self, didx) :
+        cidx = np.flatnonzero(self.present[:, didx])
+        return self.frame(cidx, np.full(len(cidx), didx))
+
+    def countries_frame(self, cidx) :
+        # Rows ordered by country and report day, like cdf
+        cidx = np.sort(cidx)
+        ci, di = np.nonzero(self.present[cidx])
+        return self.frame(cidx[ci], di)
+
+    def grouped_frame(self, geocolumn, names, didx, sums) :
+        data = {geocolumn : names, "Date" : self.astype(self.dates[didx], self.dtypes["Date"]), "RepDays" : (didx + self.first).astype(np.int64)}
+        for idx, column in enumerate(self.summable) :
+            # Like groupby sum, narrow integers are summed as int64
+            dtype = self.dtypes[column]
+            if dtype.kind in "iu" : dtype = np.dtype(np.int64)
+            data[column] = self.astype(sums[:, idx], dtype)
+        return pd.DataFrame(data)
+
+    def group_day(self, didx, geocolumn) :
+        """
+        Sum of summable metrics for each geocolumn value at one report day
+        Same result than cdf[day].groupby([geocolumn, "Date", "RepDays"]).sum()
+        """
+
+        group = self.groups[geocolumn]
+        midx = [self.mindex[column] for column in self.summable]
+        order, starts = group["order"], group["starts"]
+
+        if not len(order) : return self.grouped_frame(geocolumn, [], np.array([], dtype=int), np.zeros((0, len(midx))))
+
+        sums = np.add.reduceat(self.values[order, didx][:, midx], starts, axis=0)
+        present = np.logical_or.reduceat(self.present[order, didx], starts)
+
+        return self.grouped_frame(geocolumn, group["names"][present], np.full(present.sum(), didx), sums[present])
+
+    def group_series(self, select, geocolumn) :
+        """
+        Sum of summable metrics for one geocolumn value at each report day
+        Same result than cdf[select].groupby([geocolumn, "Date", "RepDays"]).sum()
+        """
+
+        cidx = self.country_indices(select, geocolumn)
+        midx = [self.mindex[column] for column in self.summable]
+
+        sums = self.values[cidx][:, :, midx].sum(axis=0)
+        didx = np.flatnonzero(self.present[cidx].any(axis=0))
+
+        return self.grouped_frame(geocolumn, np.full(len(didx), select, dtype=object), didx, sums[didx])
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 11:02:47
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 11:02:47
+
+import os
+import json
+import hashlib
+import logging
+import threading
+
+import urllib.request
+import urllib.error
+import urllib.parse
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pycoronadata import utils
+from pycoronadata import instrument
+
+class Fetcher() :
+
+    """
+    Download time series concurrently using conditional requests (ETag / If-Modified-Since)
+    An unchanged remote file costs a 304 and is served from the cache
+    Sources can be http(s) urls, file:// urls or local paths
+    Cache is kept in memory and on disk if a cache directory is provided
+    """
+
+    def __init__(self, cachedir=None, workers=3, timeout=60, logger=None) :
+        self.cachedir = cachedir
+        self.workers = workers
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(utils.LOG_NAME)
+
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._session = None
+
+        if self.cachedir : os.makedirs(self.cachedir, exist_ok=True)
+
+    @property
+    def session(self):
+        # One pooled session shared by all threads, only with requests installed
+        # requests is imported on first use, False is kept if it is not installed
+        with self._lock :
+            if self._session is None :
+                try :
+                    import requests
+                except ImportError :
+                    self._session = False
+                else :
+                    self._session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+                    self._session.mount("https://", adapter)
+                    self._session.mount("http://", adapter)
+        
+        return self._session or None
+
+    @staticmethod
+    def islocal(source) :
+        return urllib.parse.urlparse(source).scheme in ("", "file")
+
+    @staticmethod
+    def local_path(source) :
+        parsed = urllib.parse.urlparse(source)
+        if parsed.scheme == "file" : return urllib.request.url2pathname(parsed.path)
+        return source
+
+    def cache_fnames(self, source) :
+        key = hashlib.sha1(source.encode()).hexdigest()
+        fname = os.path.join(self.cachedir, key)
+        return fname + ".csv", fname + ".json"
+
+    def cached(self, source) :
+        with self._lock :
+            if source in self._cache : return self._cache[source]
+
+        if not self.cachedir : return None
+        content_fname, meta_fname = self.cache_fnames(source)
+        if not (os.path.isfile(content_fname) and os.path.isfile(meta_fname)) : return None
+
+        with open(meta_fname) as f : meta = json.load(f)
+        with open(content_fname, "rb") as f : content = f.read()
+
+        with self._lock :
+            self._cache[source] = (meta, content)
+        return meta, content
+
+    def store(self, source, meta, content) :
+        with self._lock :
+            self._cache[source] = (meta, content)
+
+        if not self.cachedir : return
+        # Cache files are shared between processes, each file is replaced atomically
+        # Content is replaced before meta, a reader never sends the validators of older content
+        content_fname, meta_fname = self.cache_fnames(source)
+        utils.replace_file(content_fname, lambda fname : self.write_content(fname, content))
+        utils.replace_file(meta_fname, lambda fname : self.write_meta(fname, meta))
+
+    @staticmethod
+    def write_content(fname, content) :
+        with open(fname, "wb") as f : f.write(content)
+
+    @staticmethod
+    def write_meta(fname, meta) :
+        with open(fname, "w") as f : json.dump(meta, f)
+
+    def get(self, url, headers) :
+        # Returns status code, content and response headers
+        if self.session is not None :
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code != 304 : response.raise_for_status()
+            return response.status_code, response.content, response.headers
+
+        request = urllib.request.Request(url, headers=headers)
+        try :
+            with urllib.request.urlopen(request, timeout=self.timeout) as response :
+                return response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e :
+            if e.code == 304 : return 304, b"", e.headers
+            raise
+
+    def fetch(self, source) :
+        """
+        Content of a source, downloaded only if modified since last call
+
+        Arguments:
+            source {[str]} -- [url, file:// url or local path]
+
+        Returns:
+            [bytes] -- [Source content]
+        """
+
+        if self.islocal(source) :
+            self.logger.info(f"Fetch from : {source}")
+            with open(self.local_path(source), "rb") as f :
+                return f.read()
+
+        cached = self.cached(source)
+        headers = {}
+
+        if cached :
+            meta = cached[0]
+            if meta.get("etag") : headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified") : headers["If-Modified-Since"] = meta["last_modified"]
+
+        self.logger.info(f"Fetch from : {source}")
+        status, content, rheaders = self.get(source, headers)
+
+        if status == 304 and cached :
+            self.logger.info(f"Not modified since last fetch, use cached content : {source}")
+            return cached[1]
+
+        meta = {"etag" : rheaders.get("ETag"), "last_modified" : rheaders.get("Last-Modified")}
+        self.store(source, meta, content)
+        return content
+
+    @instrument.stage("fetch")
+    def fetch_all(self, sources) :
+        """
+        Fetch several sources concurrently
+
+        Arguments:
+            sources {[str list]} -- [urls, file:// urls or local paths]
+
+        Returns:
+            [bytes list] -- [Sources content, same order than sources]
+        """
+
+        sources = list(sources)
+        if len(sources) < 2 or self.workers < 2 :
+            return [self.fetch(source) for source in sources]
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(sources))) as executor :
+            return list(executor.map(self.fetch, sources))
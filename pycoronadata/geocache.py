@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 17:20:31
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 17:20:31
+
+import os
+import json
+import hashlib
+import logging
+import threading
+
+import pandas as pd
+
+from pycoronadata import utils
+
+class GeoCache() :
+
+    """
+    Data derived from geofiles, kept in memory and on disk if a cache directory is provided
+    Entries are keyed by the geofile identity (path, modification time and size),
+    so that a modified geofile is read again
+    """
+
+    def __init__(self, cachedir=None, logger=None) :
+        self.cachedir = cachedir
+        self.logger = logger or logging.getLogger(utils.LOG_NAME)
+
+        self._memory = {}
+        self._lock = threading.Lock()
+
+        if self.cachedir : os.makedirs(self.cachedir, exist_ok=True)
+
+    @staticmethod
+    def identity(geofile) :
+        # Only local files can be identified, other geofiles are never cached
+        if not os.path.isfile(str(geofile)) : return None
+        return utils.file_identity(geofile)
+
+    def fname(self, key) :
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.cachedir, name + ".pkl")
+
+    def read(self, key) :
+        if not self.cachedir : return None
+        fname = self.fname(key)
+        if not os.path.isfile(fname) : return None
+
+        try :
+            return pd.read_pickle(fname)
+        except Exception as e :
+            self.logger.warning(f"Unable to read geo cache file {fname} ({e}), compute it again")
+            return None
+
+    def write(self, key, value) :
+        if not self.cachedir : return
+        fname = self.fname(key)
+
+        # Written next to the final file then renamed, readers never see a partial file
+        tmp = f"{fname}.{os.getpid()}.tmp"
+        pd.to_pickle(value, tmp)
+        os.replace(tmp, fname)
+
+    def get(self, geofile, name, compute) :
+        """
+        Value derived from a geofile, computed only if not found in memory or on disk
+
+        Arguments:
+            geofile {[str]} -- [Geofile path]
+            name {[list]} -- [Json serializable key of the value for this geofile]
+            compute {[function]} -- [Function without argument computing the value]
+
+        Returns:
+            [object] -- [Cached or computed value]
+        """
+
+        identity = self.identity(geofile)
+        if identity is None : return compute()
+
+        key = json.dumps([identity, name])
+        with self._lock :
+            if key in self._memory : return self._memory[key]
+
+        value = self.read(key)
+        if value is None :
+            self.logger.debug(f"Compute {name} from {geofile}")
+            value = compute()
+            self.write(key, value)
+
+        with self._lock :
+            self._memory[key] = value
+        return value
+
+    def clear(self) :
+        # Memory only, files in cachedir are kept
+        with self._lock :
+            self._memory = {}
+
+_CACHES = {}
+_LOCK = threading.Lock()
+
+def shared_cache(cachedir=None, logger=None) :
+    """
+    GeoCache shared by all instances using the same cache directory
+
+    Keyword Arguments:
+        cachedir {[str]} -- [Cache directory, memory only if None] (default: {None})
+        logger {[logging.Logger]} -- [Logger] (default: {None})
+
+    Returns:
+        [GeoCache] -- [Shared cache]
+    """
+
+    key = os.path.realpath(cachedir) if cachedir else None
+    with _LOCK :
+        if key not in _CACHES :
+            _CACHES[key] = GeoCache(cachedir, logger)
+        return _CACHES[key]
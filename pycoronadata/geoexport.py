@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 22:31:14
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 22:31:14
+
+"""
+Streaming GeoJSON export : geometry is written once, per day values are written
+apart as records linked to features by their id (geocolumn value)
+
+Geometry : GeoJSON FeatureCollection, or GeoJSONSeq (one feature by line)
+Properties : newline delimited json records, or a csv table indexed by id and date
+"""
+
+import json
+import contextlib
+
+import pandas as pd
+
+@contextlib.contextmanager
+def open_output(out) :
+    # File path or text file-like object, file-like objects are not closed
+    if hasattr(out, "write") :
+        yield out
+    else :
+        with open(out, "w", encoding="utf-8") as f :
+            yield f
+
+def feature(fid, geom, column) :
+    from shapely.geometry import mapping
+    geometry = mapping(geom) if geom is not None and not geom.is_empty else None
+    return {"type" : "Feature", "id" : fid, "properties" : {column : fid}, "geometry" : geometry}
+
+def write_geometry(out, mapper, column, seq=False) :
+    """
+    Write one feature for each geocolumn value
+
+    Arguments:
+        out {[str or file-like]} -- [File path or text file-like object]
+        mapper {[GeoSeries]} -- [Geometry for each geocolumn value (see GeoCoronaData.make_geo_mapper)]
+        column {[str]} -- [GeoColumn name, used as feature property]
+
+    Keyword Arguments:
+        seq {bool} -- [GeoJSONSeq, one feature by line, instead of a FeatureCollection] (default: {False})
+
+    Returns:
+        [int] -- [Number of features]
+    """
+
+    count = 0
+    with open_output(out) as f :
+        if not seq : f.write('{"type": "FeatureCollection", "features": [\n')
+
+        for fid, geom in mapper.items() :
+            if count and not seq : f.write(",\n")
+            f.write(json.dumps(feature(fid, geom, column)))
+            if seq : f.write("\n")
+            count += 1
+
+        if not seq : f.write("\n]}\n")
+
+    return count
+
+def format_records(cdf, column) :
+    # Feature id first, dates as ISO strings
+    cdf = cdf.reset_index(drop=True)
+    cdf["Date"] = pd.to_datetime(cdf["Date"]).dt.strftime("%Y-%m-%d")
+    cdf.insert(0, "id", cdf[column].astype(object))
+    return cdf
+
+def write_records(out, frames, column, table=False) :
+    """
+    Write per day values as they are produced
+
+    Arguments:
+        out {[str or file-like]} -- [File path or text file-like object]
+        frames {[iterable]} -- [DataFrames with column, Date and values]
+        column {[str]} -- [GeoColumn, used as record id]
+
+    Keyword Arguments:
+        table {bool} -- [csv table instead of newline delimited json records] (default: {False})
+
+    Returns:
+        [int] -- [Number of records]
+    """
+
+    count = 0
+    with open_output(out) as f :
+        for cdf in frames :
+            if cdf.empty : continue
+            cdf = format_records(cdf, column)
+
+            if table :
+                cdf.to_csv(f, header=not count, index=False)
+            else :
+                text = cdf.to_json(orient="records", lines=True, date_format="iso")
+                f.write(text if text.endswith("\n") else text + "\n")
+
+            count += len(cdf)
+
+    return count
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 21:05:37
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 21:05:37
+
+"""
+Timing hooks around pipeline stages (fetch, merge, geo resolution, groupby, cdf setup, save and load)
+merge is the join of wide time series into the long format, melt included
+
+Each instrumented call produces an event sent to the registered callbacks :
+{"stage", "start", "seconds", "rows_in", "rows_out", "memory_delta", "error"}
+Memory delta (bytes) is only measured when a callback asks for it (tracemalloc is started),
+without callback instrumented functions are called directly.
+"""
+
+import time
+import logging
+import functools
+import collections
+import threading
+import contextlib
+import tracemalloc
+
+import pandas as pd
+
+from pycoronadata import utils
+
+_CALLBACKS = ()
+_MEMORY = ()
+_LOCK = threading.Lock()
+_STARTED_TRACEMALLOC = False
+
+def enabled() :
+    return bool(_CALLBACKS)
+
+def add_callback(fun, memory=False) :
+    """
+    Register a function called with each stage event
+
+    Arguments:
+        fun {[function]} -- [Function called with the event dictionary]
+
+    Keyword Arguments:
+        memory {bool} -- [Measure memory delta of each stage, starts tracemalloc (slower)] (default: {False})
+    """
+
+    global _CALLBACKS, _MEMORY, _STARTED_TRACEMALLOC
+
+    with _LOCK :
+        # Tuples are replaced, never modified, running stages iterate on a consistent set
+        _CALLBACKS = _CALLBACKS + (fun,)
+        if memory :
+            _MEMORY = _MEMORY + (fun,)
+            if not tracemalloc.is_tracing() :
+                tracemalloc.start()
+                _STARTED_TRACEMALLOC = True
+
+def remove_callback(fun) :
+    global _CALLBACKS, _MEMORY, _STARTED_TRACEMALLOC
+
+    with _LOCK :
+        _CALLBACKS = tuple(callback for callback in _CALLBACKS if callback is not fun)
+        _MEMORY = tuple(callback for callback in _MEMORY if callback is not fun)
+        if not _MEMORY and _STARTED_TRACEMALLOC :
+            tracemalloc.stop()
+            _STARTED_TRACEMALLOC = False
+
+def count(value) :
+    # Number of rows of a stage input or output, None if unknown
+    if isinstance(value, (pd.DataFrame, pd.Series, dict, set)) : return len(value)
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, pd.DataFrame) for item in value) :
+        return sum(len(item) for item in value)
+    if isinstance(value, (list, tuple)) : return len(value)
+    return None
+
+def first_count(args) :
+    for arg in args :
+        rows = count(arg)
+        if rows is not None : return rows
+    return None
+
+def emit(event) :
+    for callback in _CALLBACKS :
+        try :
+            callback(event)
+        except Exception :
+            logging.getLogger(utils.LOG_NAME).exception(f"Instrumentation callback failed for stage {event['stage']}")
+
+def stage(name, rows=None) :
+    """
+    Decorator sending an event for each call of the decorated function
+
+    Arguments:
+        name {[str]} -- [Stage name]
+
+    Keyword Arguments:
+        rows {[function]} -- [Rows in from the function arguments] (default: {first dataframe, list or set argument})
+
+    Returns:
+        [function] -- [Decorator]
+    """
+
+    def decorator(fun) :
+
+        @functools.wraps(fun)
+        def wrapper(* args, ** kwargs) :
+            if not _CALLBACKS : return fun(* args, ** kwargs)
+
+            rows_in = rows(* args, ** kwargs) if rows else first_count(args)
+            memory = tracemalloc.get_traced_memory()[0] if _MEMORY else None
+            event = {"stage" : name, "start" : time.time(), "rows_in" : rows_in, "rows_out" : None, "memory_delta" : None, "error" : None}
+            start = time.perf_counter()
+
+            try :
+                result = fun(* args, ** kwargs)
+            except Exception as e :
+                event["error"] = repr(e)
+                raise
+            else :
+                event["rows_out"] = count(result)
+                return result
+            finally :
+                event["seconds"] = time.perf_counter() - start
+                if memory is not None and tracemalloc.is_tracing() :
+                    event["memory_delta"] = tracemalloc.get_traced_memory()[0] - memory
+                emit(event)
+
+        return wrapper
+
+    return decorator
+
+class Recorder() :
+
+    """
+    Callback keeping stage events in memory, with a summary by stage
+    """
+
+    def __init__(self, maxlen=None) :
+        self.events = collections.deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def __call__(self, event) :
+        with self._lock :
+            self.events.append(event)
+
+    def clear(self) :
+        with self._lock :
+            self.events.clear()
+
+    def frame(self) :
+        with self._lock :
+            events = list(self.events)
+        return pd.DataFrame(events, columns=["stage", "start", "seconds", "rows_in", "rows_out", "memory_delta", "error"])
+
+    def summary(self) :
+        """
+        Events aggregated by stage
+
+        Returns:
+            [pd.DataFrame] -- [calls, total, mean and max seconds, rows in and out, memory delta and errors for each stage]
+        """
+
+        # Unknown values are not counted as 0
+        total = lambda values : values.sum(min_count=1)
+
+        df = self.frame()
+        summary = df.groupby("stage", sort=False).agg(
+            calls=("seconds", "size"), seconds=("seconds", "sum"), mean_seconds=("seconds", "mean"), max_seconds=("seconds", "max"),
+            rows_in=("rows_in", total), rows_out=("rows_out", total), memory_delta=("memory_delta", total), errors=("error", "count"))
+        return summary.sort_values("seconds", ascending=False)
+
+def log_callback(logger=None, level=logging.DEBUG) :
+    """
+    Callback writing each stage event in a logger
+
+    Keyword Arguments:
+        logger {[logging.Logger]} -- [Logger] (default: {None})
+        level {int} -- [Logging level] (default: {logging.DEBUG})
+
+    Returns:
+        [function] -- [Callback]
+    """
+
+    logger = logger or logging.getLogger(utils.LOG_NAME)
+
+    def callback(event) :
+        memory = "" if event["memory_delta"] is None else f", memory delta : {event['memory_delta'] / 1e6:.2f} MB"
+        logger.log(level, f"Stage {event['stage']} : {event['seconds']:.4f}s, rows : {event['rows_in']} -> {event['rows_out']}{memory}")
+
+    return callback
+
+@contextlib.contextmanager
+def recording(memory=False, maxlen=None) :
+    """
+    Record stage events within a with block
+
+    Keyword Arguments:
+        memory {bool} -- [Measure memory delta of each stage] (default: {False})
+        maxlen {int} -- [Maximum number of events kept] (default: {None})
+
+    Returns:
+        [Recorder] -- [Recorder, removed at the end of the block]
+    """
+
+    recorder = Recorder(maxlen)
+    add_callback(recorder, memory)
+    try :
+        yield recorder
+    finally :
+        remove_callback(recorder)
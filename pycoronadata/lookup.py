@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 16:37:52
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 16:37:52
+
+import numpy as np
+import pandas as pd
+
+class ColumnIndex() :
+
+    """
+    Positions of each value of a column, built once
+    Rows for one value are found with a dict lookup and a slice instead of a full column scan
+    Positions are kept in the original order, so that selected rows match a boolean mask selection
+    """
+
+    def __init__(self, values) :
+        codes, uniques = pd.factorize(values)
+
+        # Stable sort : positions are increasing within each value
+        self.order = np.argsort(codes, kind="mergesort")
+        scodes = codes[self.order]
+
+        keys = np.arange(len(uniques))
+        starts = np.searchsorted(scodes, keys, side="left")
+        stops = np.searchsorted(scodes, keys, side="right")
+        self.offsets = {value : (start, stop) for value, start, stop in zip(uniques, starts, stops)}
+
+    def nbytes(self) :
+        return self.order.nbytes
+
+    def __contains__(self, value) :
+        return value in self.offsets
+
+    def positions(self, value) :
+        start, stop = self.offsets.get(value, (0, 0))
+        return self.order[start:stop]
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 21:48:26
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 21:48:26
+
+import time
+import datetime
+import threading
+import collections
+
+class QueryCache() :
+
+    """
+    Bounded query results cache, least recently used results are evicted first
+    Results older than ttl are computed again
+    Stored results are never returned directly, callers receive copies
+    """
+
+    def __init__(self, maxsize=128, ttl=None) :
+        if ttl is not None and not isinstance(ttl, datetime.timedelta) :
+            raise ValueError("ttl must be a datetime.timedelta instance")
+
+        self.maxsize = maxsize
+        self.ttl = ttl.total_seconds() if ttl is not None else None
+
+        self.hits = 0
+        self.misses = 0
+
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) :
+        return len(self._data)
+
+    def get(self, key) :
+        # Stored value or None
+        with self._lock :
+            item = self._data.get(key)
+
+            if item is not None and self.ttl is not None and time.monotonic() - item[0] > self.ttl :
+                del self._data[key]
+                item = None
+
+            if item is None :
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value) :
+        with self._lock :
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize :
+                self._data.popitem(last=False)
+
+    def fetch(self, key, compute) :
+        """
+        Copy of the cached result, computed and stored if not found
+        Concurrent misses on the same key may compute it several times
+
+        Arguments:
+            key {[tuple]} -- [Hashable key, normalized query arguments]
+            compute {[function]} -- [Function without argument computing the result]
+
+        Returns:
+            [pd.DataFrame] -- [Copy of the result]
+        """
+
+        value = self.get(key)
+        if value is None :
+            value = compute()
+            self.put(key, value)
+        return value.copy()
+
+    def clear(self) :
+        with self._lock :
+            self._data.clear()
+
+    def stats(self) :
+        """
+        Cache information
+
+        Returns:
+            [dict] -- [size, maxsize, ttl (seconds), hits and misses]
+        """
+
+        return {"size" : len(self), "maxsize" : self.maxsize, "ttl" : self.ttl, "hits" : self.hits, "misses" : self.misses}
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 19:48:12
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 19:48:12
+
+import time
+import random
+import logging
+import datetime
+import threading
+
+from pycoronadata import utils
+
+class Refresher() :
+
+    """
+    Call a refresh function periodically from a background thread
+    Delays are randomized (jitter) so that several processes do not refresh at the same time,
+    and grow exponentially (backoff) after consecutive failures
+    """
+
+    def __init__(self, fun, interval, first=None, jitter=.1, backoff=2, max_delay=None, logger=None) :
+        """
+        Arguments:
+            fun {[function]} -- [Refresh function, called without argument, returns False if nothing was refreshed]
+            interval {[datetime.timedelta]} -- [Time between two refreshes]
+
+        Keyword Arguments:
+            first {[datetime.datetime]} -- [Time of the first refresh] (default: {now + interval})
+            jitter {float} -- [Random fraction of the delay added or removed] (default: {.1})
+            backoff {float} -- [Delay multiplier after each consecutive failure] (default: {2})
+            max_delay {[datetime.timedelta]} -- [Maximum delay after failures] (default: {10 x interval})
+            logger {[logging.Logger]} -- [Logger] (default: {None})
+        """
+
+        if not isinstance(interval, datetime.timedelta) :
+            raise ValueError("interval must be a datetime.timedelta instance")
+
+        self.fun = fun
+        self.interval = interval
+        self.jitter = jitter
+        self.backoff = backoff
+        self.max_delay = max_delay or interval * 10
+        self.logger = logger or logging.getLogger(utils.LOG_NAME)
+
+        self.last_refresh = None
+        self.last_duration = None
+        self.last_error = None
+        self.failures = 0
+        self.next_refresh = first or datetime.datetime.now() + self.delay()
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def delay(self) :
+        # Interval, increased after failures, with jitter
+        delay = min(self.interval * (self.backoff ** self.failures), self.max_delay)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def refresh(self) :
+        """
+        Call the refresh function now, in the current thread
+
+        Returns:
+            [bool] -- [True if the refresh succeeded]
+        """
+
+        with self._lock :
+            start = time.perf_counter()
+            refreshed = False
+
+            try :
+                refreshed = self.fun() is not False
+            except Exception as e :
+                self.failures += 1
+                self.last_error = repr(e)
+                self.logger.exception(f"Refresh failed ({self.failures} consecutive failure(s))")
+            else :
+                self.failures = 0
+                self.last_error = None
+                if refreshed : self.last_refresh = datetime.datetime.now()
+                else : self.logger.info("Nothing refreshed, last refresh unchanged")
+
+            self.last_duration = time.perf_counter() - start
+            self.next_refresh = datetime.datetime.now() + self.delay()
+            return refreshed
+
+    def run(self) :
+        while True :
+            wait = (self.next_refresh - datetime.datetime.now()).total_seconds()
+            if self._stop.wait(max(wait, 0)) : break
+            self.refresh()
+
+    def start(self) :
+        if self.running : return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="pycoronadata-refresher", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Start background refresh, next refresh at : {self.next_refresh}")
+
+    def stop(self, timeout=None) :
+        self._stop.set()
+        if self._thread is not None :
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) :
+        """
+        Refresh information
+
+        Returns:
+            [dict] -- [running, last_refresh, last_duration (seconds), next_refresh, failures and last_error]
+        """
+
+        return {
+            "running" : self.running,
+            "last_refresh" : self.last_refresh,
+            "last_duration" : self.last_duration,
+            "next_refresh" : self.next_refresh,
+            "failures" : self.failures,
+            "last_error" : self.last_error
+            }
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 15:52:09
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 15:52:09
+
+import numpy as np
+
+class Rollup() :
+
+    """
+    cdf summed by a geo column, Date and RepDays, computed once
+    Rows for one geo value or for one report day are retrieved with offset tables
+    """
+
+    def __init__(self, cdf, column, columns) :
+        self.column = column
+        self.frame = cdf.groupby([column, "Date", "RepDays"], observed=True)[columns].sum().reset_index()
+
+        # Groupby output is sorted by column : offsets of each value
+        keys = self.frame[column].to_numpy()
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(keys)]
+        self.offsets = {keys[start] : (start, stop) for start, stop in zip(starts, stops)}
+
+        # Rows ordered by report day, column order is kept within a day
+        repdays = self.frame["RepDays"].to_numpy()
+        self.byday = np.argsort(repdays, kind="mergesort")
+        self.repdays = repdays[self.byday]
+
+    def __len__(self) :
+        return len(self.frame)
+
+    def nbytes(self) :
+        return self.frame.memory_usage(deep=True).sum() + self.byday.nbytes + self.repdays.nbytes
+
+    def rows(self, positions) :
+        return self.frame.iloc[positions].reset_index(drop=True)
+
+    def positions(self, value) :
+        start, stop = self.offsets.get(value, (0, 0))
+        return np.arange(start, stop)
+
+    def select(self, value) :
+        return self.rows(self.positions(value))
+
+    def day(self, repday) :
+        start, stop = np.searchsorted(self.repdays, [repday, repday + 1])
+        return self.rows(self.byday[start:stop])
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 19:05:44
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 19:05:44
+
+"""
+cdf snapshots shared between processes with memory mapped files
+
+A snapshot directory contains one sub directory by generation, with one .npy file by column,
+and a manifest describing the last generation. Text columns are stored as categorical codes,
+dates as datetime64. Publishing writes a new generation then replaces the manifest atomically,
+attached processes map the files read-only and share them through the page cache.
+"""
+
+import os
+import json
+import shutil
+import logging
+
+import numpy as np
+import pandas as pd
+
+from pycoronadata import utils
+
+MANIFEST = "manifest.json"
+LOCK = ".publish.lock"
+
+def manifest_fname(snapdir) :
+    return os.path.join(snapdir, MANIFEST)
+
+def read_manifest(snapdir) :
+    """
+    Manifest of the last published generation
+
+    Arguments:
+        snapdir {[str]} -- [Snapshot directory]
+
+    Returns:
+        [dict] -- [Manifest, None if nothing has been published]
+    """
+
+    fname = manifest_fname(snapdir)
+    if not os.path.isfile(fname) : return None
+    with open(fname) as f :
+        return json.load(f)
+
+def encode_column(values) :
+    # (kind, array, manifest information)
+    if isinstance(values.dtype, pd.CategoricalDtype) :
+        return "category", values.cat.codes.to_numpy(), {"categories" : values.cat.categories.tolist()}
+
+    if pd.api.types.is_datetime64_any_dtype(values) :
+        return "values", values.to_numpy(), {}
+
+    if values.dtype == object :
+        # datetime.date column (Date) or text column
+        if len(values) and hasattr(values.iloc[0], "isoformat") :
+            return "values", pd.to_datetime(values).to_numpy(), {}
+        return encode_column(values.astype("category"))
+
+    return "values", values.to_numpy(), {}
+
+def decode_column(array, column) :
+    if column["kind"] == "category" :
+        return pd.Categorical.from_codes(array, column["categories"])
+    return array
+
+def publish(cdf, snapdir, keep=2, logger=None, initial=False) :
+    """
+    Write cdf as a new snapshot generation
+    Previous generations are removed, except the keep last ones which may still be read
+    Publishers of the same snapdir, in any process, are serialized with a lock file
+
+    Arguments:
+        cdf {[pd.DataFrame]} -- [cdf to publish]
+        snapdir {[str]} -- [Snapshot directory]
+
+    Keyword Arguments:
+        keep {int} -- [Number of generations kept on disk] (default: {2})
+        logger {[logging.Logger]} -- [Logger] (default: {None})
+        initial {bool} -- [Only publish if nothing has been published in snapdir yet] (default: {False})
+
+    Returns:
+        [int] -- [Published generation, None if initial and a generation already exists]
+    """
+
+    logger = logger or logging.getLogger(utils.LOG_NAME)
+    os.makedirs(snapdir, exist_ok=True)
+
+    with utils.FileLock(os.path.join(snapdir, LOCK)) :
+        if initial and read_manifest(snapdir) is not None : return None
+        return write_generation(cdf, snapdir, keep, logger)
+
+def write_generation(cdf, snapdir, keep, logger) :
+    previous = read_manifest(snapdir)
+    generation = previous["generation"] + 1 if previous else 1
+    name = f"gen-{generation}"
+
+    # Generation is written in a temporary directory, then renamed
+    tmpdir = os.path.join(snapdir, f".{name}.{os.getpid()}.tmp")
+    if os.path.isdir(tmpdir) : shutil.rmtree(tmpdir)
+    os.makedirs(tmpdir)
+
+    columns = []
+    for idx, column in enumerate(cdf.columns) :
+        kind, array, extra = encode_column(cdf[column])
+        fname = f"{idx}.npy"
+        np.save(os.path.join(tmpdir, fname), np.ascontiguousarray(array))
+        columns.append({"name" : column, "kind" : kind, "file" : fname, ** extra})
+
+    index = None
+    if not cdf.index.equals(pd.RangeIndex(len(cdf))) :
+        index = "index.npy"
+        np.save(os.path.join(tmpdir, index), cdf.index.to_numpy())
+
+    # Left by an interrupted publication, never referenced by the manifest
+    target = os.path.join(snapdir, name)
+    if os.path.isdir(target) : shutil.rmtree(target)
+    os.replace(tmpdir, target)
+
+    manifest = {"generation" : generation, "path" : name, "rows" : len(cdf), "columns" : columns, "index" : index}
+    tmp = manifest_fname(snapdir) + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as f : json.dump(manifest, f)
+    os.replace(tmp, manifest_fname(snapdir))
+
+    logger.info(f"Publish cdf snapshot generation {generation} ({len(cdf)} rows) at : {snapdir}")
+
+    # Attached processes keep their mapping of removed files
+    for old in range(generation - keep, 0, -1) :
+        path = os.path.join(snapdir, f"gen-{old}")
+        if not os.path.isdir(path) : break
+        shutil.rmtree(path, ignore_errors=True)
+
+    return generation
+
+def load(snapdir, manifest) :
+    path = os.path.join(snapdir, manifest["path"])
+    data = {}
+
+    for column in manifest["columns"] :
+        array = np.load(os.path.join(path, column["file"]), mmap_mode="r")
+        data[column["name"]] = decode_column(array, column)
+
+    index = np.load(os.path.join(path, manifest["index"]), mmap_mode="r") if manifest["index"] else None
+    columns = [column["name"] for column in manifest["columns"]]
+
+    # No copy : each column keeps its own memory mapped block
+    return pd.DataFrame(data, index=index, columns=columns, copy=False)
+
+def attach(snapdir, logger=None, retries=3) :
+    """
+    Read-only cdf of the last published generation, columns are memory mapped
+
+    Arguments:
+        snapdir {[str]} -- [Snapshot directory]
+
+    Keyword Arguments:
+        logger {[logging.Logger]} -- [Logger] (default: {None})
+        retries {int} -- [Attempts when a generation is removed while being attached] (default: {3})
+
+    Returns:
+        [tuple] -- [(generation, cdf)]
+
+    Raises:
+        ValueError -- [Raised when nothing has been published in snapdir]
+    """
+
+    logger = logger or logging.getLogger(utils.LOG_NAME)
+
+    for _ in range(retries) :
+        manifest = read_manifest(snapdir)
+        if manifest is None :
+            raise ValueError(f"No snapshot published in : {snapdir}")
+
+        try :
+            cdf = load(snapdir, manifest)
+        except FileNotFoundError :
+            logger.debug(f"Snapshot generation {manifest['generation']} removed while attaching, retry")
+            continue
+
+        logger.debug(f"Attach cdf snapshot generation {manifest['generation']} from : {snapdir}")
+        return manifest["generation"], cdf
+
+    raise ValueError(f"Unable to attach snapshot from : {snapdir}")
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# @Author: jsgounot
+# @Date:   2026-10-16 13:24:05
+# @Last modified by:   jsgounot
+# @Last Modified time: 2026-10-16 13:24:05
+
+import os
+import logging
+
+import pandas as pd
+
+from pycoronadata import utils
+
+class Storage() :
+
+    """
+    Read and write a cdf on disk
+    Storage is selected based on the file extension (see storage_from_fname)
+    """
+
+    EXTENSIONS = ()
+
+    def __init__(self, logger=None) :
+        self.logger = logger or logging.getLogger(utils.LOG_NAME)
+
+    def read(self, fname, memory_map=False) :
+        raise NotImplementedError()
+
+    def write(self, cdf, fname) :
+        raise NotImplementedError()
+
+class CSVStorage(Storage) :
+
+    """
+    Plain text storage, dtypes are not kept
+    """
+
+    EXTENSIONS = (".csv", ".tsv", ".txt")
+
+    def read(self, fname, memory_map=False) :
+        df = pd.read_csv(fname, memory_map=memory_map)
+        df["Date"] = pd.to_datetime(df["Date"], infer_datetime_format=True).dt.date
+        return df
+
+    def write(self, cdf, fname) :
+        cdf.to_csv(fname, index=False)
+
+class ParquetStorage(Storage) :
+
+    """
+    Columnar compressed storage, dtypes are kept (requires pyarrow)
+    """
+
+    EXTENSIONS = (".parquet", ".pq")
+
+    def read(self, fname, memory_map=False) :
+        return pd.read_parquet(fname, engine="pyarrow", memory_map=memory_map)
+
+    def write(self, cdf, fname) :
+        cdf.to_parquet(fname, engine="pyarrow", index=False)
+
+class FeatherStorage(Storage) :
+
+    """
+    Arrow IPC storage, dtypes are kept (requires pyarrow)
+    Files are written uncompressed, so that several processes memory mapping
+    the same file share its numeric columns instead of copying them
+    """
+
+    EXTENSIONS = (".feather", ".arrow", ".ipc")
+
+    def read(self, fname, memory_map=False) :
+        from pyarrow import feather
+        table = feather.read_table(fname, memory_map=memory_map)
+        return table.to_pandas(split_blocks=memory_map)
+
+    def write(self, cdf, fname) :
+        cdf = cdf.reset_index(drop=True)
+        cdf.to_feather(fname, compression="uncompressed")
+
+STORAGES = [CSVStorage, ParquetStorage, FeatherStorage]
+
+def storage_from_fname(fname, logger=None) :
+    """
+    Storage instance based on file extension, CSV if the extension is unknown
+
+    Arguments:
+        fname {[str]} -- [File path]
+
+    Keyword Arguments:
+        logger {[logging.Logger]} -- [Logger] (default: {None})
+
+    Returns:
+        [Storage] -- [Storage instance]
+    """
+
+    ext = os.path.splitext(str(fname))[1].lower()
+    for storage in STORAGES :
+        if ext in storage.EXTENSIONS :
+            return storage(logger)
+
+    logger = logger or logging.getLogger(utils.LOG_NAME)
+    logger.debug(f"Unknown extension '{ext}' for {fname}, use CSV storage")
+    return CSVStorage(logger)
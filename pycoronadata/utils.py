@@ -5,12 +5,19 @@
 # @Last Modified time: 2020-04-17 13:43:22
 
 import os
+import json
 import tempfile
 import datetime
 
 import logging
 from logging.handlers import RotatingFileHandler
 
+try :
+    import fcntl
+except ImportError :
+    fcntl = None
+    import msvcrt
+
 DEFAULT_LEVEL = logging.INFO
 LOG_NAME = "pycoronadata"
 
@@ -69,6 +76,12 @@ class WatchFile() :
     def isfile(self) :
         return os.path.isfile(self.fname)
 
+    def next_update(self) :
+        # datetime of the next allowed update, now if the file does not exist
+        if not self.isfile() : return datetime.datetime.now()
+        lastmod = datetime.datetime.fromtimestamp(os.path.getmtime(self.fname))
+        return lastmod + self.utime
+
     def time_next_update(self) :
         if not self.isfile() :
             self.logger.warning(f"File not found : {self.fname}") 
@@ -110,6 +123,160 @@ class WatchFile() :
 
         return change
 
+class FileLock() :
+
+    """
+    Exclusive lock shared between processes, based on a lock file
+    Uses flock on posix systems and msvcrt.locking on windows
+    Can be used as a context manager, which returns True if the lock has been acquired
+    """
+
+    def __init__(self, fname, blocking=True) :
+        self.fname = fname
+        self.blocking = blocking
+        self._file = None
+
+    @property
+    def locked(self):
+        return self._file is not None
+
+    def acquire(self) :
+        handle = open(self.fname, "a+")
+
+        try :
+            if fcntl is not None :
+                flags = fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(handle.fileno(), flags)
+            else :
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK if self.blocking else msvcrt.LK_NBLCK, 1)
+
+        except OSError :
+            handle.close()
+            return False
+
+        self._file = handle
+        return True
+
+    def release(self) :
+        if self._file is None : return
+
+        if fcntl is not None : 
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else :
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) :
+        return self.acquire()
+
+    def __exit__(self, * args) :
+        self.release()
+
+def replace_file(fname, write) :
+    # write(path) is called on a temporary file renamed to fname, readers never see a partial file
+    tmp = f"{fname}.{os.getpid()}.tmp"
+    try :
+        write(tmp)
+        os.replace(tmp, fname)
+    finally :
+        if os.path.isfile(tmp) : os.remove(tmp)
+
+def file_identity(fname) :
+    # Path, modification time and size are enough to know if a file has been replaced
+    fname = os.path.realpath(str(fname))
+    stat = os.stat(fname)
+    return [fname, stat.st_mtime, stat.st_size]
+
+class CoorCache() :
+
+    """
+    Persistent cache of coordinates (longitude, latitude, guess) resolved to a country
+    The cache is bound to a geofile and is dropped when the geofile changes
+    Without file name, or with a geofile which is not a local file (i.e an url), the cache is only kept in memory
+    """
+
+    def __init__(self, fname=None, geofile=None, logger=None) :
+        self.fname = fname
+        self.logger = logger or logging.getLogger(LOG_NAME)
+        self.identity = self.geofile_identity(geofile)
+        self.data = self.load()
+
+    def __contains__(self, coor) :
+        return self.key(coor) in self.data
+
+    def __getitem__(self, coor) :
+        return self.data[self.key(coor)]
+
+    def __len__(self) :
+        return len(self.data)
+
+    @staticmethod
+    def key(coor) :
+        # NaN can not be used as dict key (nan != nan), None is used instead
+        return tuple(None if value != value else value for value in coor)
+
+    @staticmethod
+    def value(country) :
+        return None if country != country else country
+
+    @staticmethod
+    def geofile_identity(geofile) :
+        # Only local files can be identified
+        if not geofile or not os.path.isfile(str(geofile)) : return None
+        return file_identity(geofile)
+
+    def load(self) :
+        if not self.fname or self.identity is None or not os.path.isfile(self.fname) :
+            return {}
+
+        try :
+            with open(self.fname) as f :
+                content = json.load(f)
+        except (OSError, ValueError) as e :
+            self.logger.warning(f"Unable to read coordinates cache ({self.fname}), cache ignored : {e}")
+            return {}
+
+        if content.get("geofile") != self.identity :
+            self.logger.info(f"Geofile changed since last run, coordinates cache dropped : {self.fname}")
+            return {}
+
+        self.logger.debug(f"Load {len(content['coordinates'])} coordinates from cache : {self.fname}")
+        return {tuple(coor[:-1]) : coor[-1] for coor in content["coordinates"]}
+
+    def check(self, geofile) :
+        identity = self.geofile_identity(geofile)
+        if identity != self.identity :
+            if self.data : self.logger.info("Geofile changed, coordinates cache cleared")
+            self.identity = identity
+            self.data = {}
+
+    def missing(self, coordinates) :
+        return [coor for coor in coordinates if coor not in self]
+
+    def update(self, items) :
+        for coor, country in items :
+            self.data[self.key(coor)] = self.value(country)
+
+    def get(self, coor, default=None) :
+        country = self.data.get(self.key(coor), default)
+        return default if country is None else country
+
+    def save(self) :
+        if not self.fname or self.identity is None : return
+        self.logger.debug(f"Save {len(self)} coordinates to cache : {self.fname}")
+
+        content = {"geofile" : self.identity, "coordinates" : [list(coor) + [country] for coor, country in self.data.items()]}
+        replace_file(self.fname, lambda fname : self.write(fname, content))
+
+    @staticmethod
+    def write(fname, content) :
+        with open(fname, "w") as f :
+            json.dump(content, f)
+
 def default_logger(fname=None, logger=None, stream=True, level=DEFAULT_LEVEL) :
     
     logger = logger or logging.getLogger(LOG_NAME)